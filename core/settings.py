@@ -180,6 +180,9 @@ ZAPI_WEBHOOK_URL_TOKEN = os.environ.get("ZAPI_WEBHOOK_URL_TOKEN")
 if not ZAPI_WEBHOOK_URL_TOKEN:
     raise ValueError("ZAPI_WEBHOOK_URL_TOKEN environment variable is required")
 
+# Tamanho máximo (bytes) do corpo aceito no webhook Z-API
+ZAPI_MAX_BODY = int(os.environ.get("ZAPI_MAX_BODY", "65536"))
+
 # External system configuration
 EXTERNAL_SYSTEM_URL = os.environ.get("EXTERNAL_SYSTEM_URL", "")
 EXTERNAL_SYSTEM_TIMEOUT = int(os.environ.get("EXTERNAL_SYSTEM_TIMEOUT", "10"))
@@ -190,6 +193,22 @@ MESSAGE_RETENTION_DAYS = int(os.environ.get("MESSAGE_RETENTION_DAYS", "3"))
 # Consulta de status de carga - URL do sistema externo
 CARGA_STATUS_URL = os.environ.get("CARGA_STATUS_URL", "")
 CARGA_STATUS_TIMEOUT = int(os.environ.get("CARGA_STATUS_TIMEOUT", "10"))
+# Tempo (segundos) que a resposta de uma carga fica em cache (0 desativa)
+CARGA_CACHE_TIMEOUT = int(os.environ.get("CARGA_CACHE_TIMEOUT", "60"))
+# Tempo (segundos) que uma falha na consulta de uma carga fica em cache, para
+# não repetir a chamada externa a cada requisição durante uma instabilidade
+# (0 desativa)
+CARGA_ERROR_CACHE_TIMEOUT = int(os.environ.get("CARGA_ERROR_CACHE_TIMEOUT", "10"))
+
+# Tempo (segundos) que a busca de um token de API fica em cache. Com cache
+# compartilhado (ex.: Redis) pode ser maior, pois alterações no admin invalidam
+# a entrada; com o cache local padrão, é o atraso máximo de uma revogação
+API_TOKEN_CACHE_TIMEOUT = int(os.environ.get("API_TOKEN_CACHE_TIMEOUT", "45"))
+
+# Retenção de logs da API de consulta de carga (em dias)
+API_REQUEST_LOG_RETENTION_DAYS = int(
+    os.environ.get("API_REQUEST_LOG_RETENTION_DAYS", "7")
+)
 
 # Webhook de retorno de entrega (callback da empresa externa)
 DELIVERY_WEBHOOK_TOKEN = os.environ.get("DELIVERY_WEBHOOK_TOKEN", "")
@@ -199,17 +218,43 @@ if not DELIVERY_WEBHOOK_TOKEN:
         "Set it in your .env file."
     )
 
+# Tamanho máximo (bytes) do corpo aceito no webhook de entrega (lotes de status)
+DELIVERY_MAX_BODY = int(os.environ.get("DELIVERY_MAX_BODY", "1048576"))
+
 # URL base do sistema interno (para encaminhar callback)
 INTERNAL_SYSTEM_URL = os.environ.get("INTERNAL_SYSTEM_URL", "http://127.0.0.1:8000")
 
 # Timeout para requisições ao sistema interno (em segundos)
 INTERNAL_FORWARD_TIMEOUT = int(os.environ.get("INTERNAL_FORWARD_TIMEOUT", "10"))
 
+# Threads do pool que processa os webhooks em segundo plano
+BACKGROUND_WORKERS = int(os.environ.get("BACKGROUND_WORKERS", "4"))
+
+# Retentativas do encaminhamento ao sistema externo após falha de rede
+# (atraso em segundos: FORWARD_RETRY_BACKOFF * 2^tentativa)
+FORWARD_MAX_RETRIES = int(os.environ.get("FORWARD_MAX_RETRIES", "3"))
+FORWARD_RETRY_BACKOFF = int(os.environ.get("FORWARD_RETRY_BACKOFF", "2"))
+
+# Espera (segundos) entre as URLs do fallback: exponencial a partir da base,
+# limitada ao teto (também aplicado ao Retry-After recebido)
+FALLBACK_BACKOFF_BASE = float(os.environ.get("FALLBACK_BACKOFF_BASE", "0.1"))
+FALLBACK_BACKOFF_CAP = float(os.environ.get("FALLBACK_BACKOFF_CAP", "2.0"))
+
 # Retenção de logs de delivery (em dias)
 DELIVERY_WEBHOOK_LOG_RETENTION_DAYS = int(
     os.environ.get("DELIVERY_WEBHOOK_LOG_RETENTION_DAYS", "7")
 )
 
+# Gravação em lote dos logs da API: um INSERT a cada LOG_BATCH_SIZE registros
+# ou LOG_FLUSH_INTERVAL segundos, o que vier primeiro
+LOG_BATCH_SIZE = int(os.environ.get("LOG_BATCH_SIZE", "100"))
+LOG_FLUSH_INTERVAL = float(os.environ.get("LOG_FLUSH_INTERVAL", "0.5"))
+# Máximo de logs aguardando gravação; acima disso os novos são descartados
+LOG_QUEUE_MAXSIZE = int(os.environ.get("LOG_QUEUE_MAXSIZE", "10000"))
+
+# Registros removidos por DELETE na limpeza de logs (comando cleanup_old_logs)
+CLEANUP_BATCH_SIZE = int(os.environ.get("CLEANUP_BATCH_SIZE", "5000"))
+
 LOGIN_REDIRECT_URL = "/dashboard/"
 LOGOUT_REDIRECT_URL = "/"
 
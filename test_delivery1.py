@@ -6,8 +6,11 @@ Uso:
     python test_delivery1.py
 """
 
-import requests
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
 
 # Configurações
 WEBHOOK_URL = (
@@ -15,6 +18,11 @@ WEBHOOK_URL = (
 )
 INTERNAL_SYSTEM_URL = "http://127.0.0.1:8003"  # Ajuste conforme necessário
 
+# Sessão compartilhada (reaproveita a conexão) e trava para que a saída
+# dos testes executados em paralelo não se misture
+SESSION = requests.Session()
+PRINT_LOCK = threading.Lock()
+
 # Payload de teste no novo formato Meta/WhatsApp
 test_payload = {
     "account": {"id": "xxxxxxxxxxx"},
@@ -84,85 +92,96 @@ test_payload_multiple = {
 }
 
 
+def _post(payload):
+    """Envia o payload ao webhook; retorna (response, erro)."""
+    try:
+        response = SESSION.post(
+            WEBHOOK_URL, json=payload, headers={"Content-Type": "application/json"}
+        )
+        return response, None
+    except Exception as e:
+        return None, e
+
+
+def _print_response(response):
+    print(f"\nStatus Code: {response.status_code}")
+    print("Response:")
+    print(json.dumps(response.json(), indent=2, ensure_ascii=False))
+
+
 def test_single_status():
     """Testa webhook com status único."""
-    print("\n" + "=" * 60)
-    print("TESTE 1: Status único (delivered)")
-    print("=" * 60)
+    response, error = _post(test_payload)
 
-    try:
-        response = requests.post(
-            WEBHOOK_URL, json=test_payload, headers={"Content-Type": "application/json"}
-        )
+    with PRINT_LOCK:
+        print("\n" + "=" * 60)
+        print("TESTE 1: Status único (delivered)")
+        print("=" * 60)
 
-        print(f"\nStatus Code: {response.status_code}")
-        print("Response:")
-        print(json.dumps(response.json(), indent=2, ensure_ascii=False))
+        try:
+            if error:
+                raise error
 
-        if response.status_code == 200:
-            print("\n✅ Teste passou!")
-        else:
-            print("\n❌ Teste falhou!")
+            _print_response(response)
 
-    except Exception as e:
-        print(f"\n❌ Erro ao fazer requisição: {e}")
+            if response.status_code == 200:
+                print("\n✅ Teste passou!")
+            else:
+                print("\n❌ Teste falhou!")
+
+        except Exception as e:
+            print(f"\n❌ Erro ao fazer requisição: {e}")
 
 
 def test_multiple_statuses():
     """Testa webhook com múltiplos status."""
-    print("\n" + "=" * 60)
-    print("TESTE 2: Múltiplos status (sent → delivered → read)")
-    print("=" * 60)
+    response, error = _post(test_payload_multiple)
 
-    try:
-        response = requests.post(
-            WEBHOOK_URL,
-            json=test_payload_multiple,
-            headers={"Content-Type": "application/json"},
-        )
+    with PRINT_LOCK:
+        print("\n" + "=" * 60)
+        print("TESTE 2: Múltiplos status (sent → delivered → read)")
+        print("=" * 60)
 
-        print(f"\nStatus Code: {response.status_code}")
-        print("Response:")
-        print(json.dumps(response.json(), indent=2, ensure_ascii=False))
+        try:
+            if error:
+                raise error
 
-        if response.status_code == 200:
-            data = response.json()
-            print("\n✅ Teste passou!")
-            print(f"   Processados: {data.get('processed', 0)}/{data.get('total', 0)}")
-            print(f"   Falhados: {data.get('failed', 0)}")
-        else:
-            print("\n❌ Teste falhou!")
+            _print_response(response)
 
-    except Exception as e:
-        print(f"\n❌ Erro ao fazer requisição: {e}")
+            if response.status_code == 200:
+                data = response.json()
+                print("\n✅ Teste passou!")
+                print(f"   Status recebidos: {data.get('total', 0)}")
+            else:
+                print("\n❌ Teste falhou!")
+
+        except Exception as e:
+            print(f"\n❌ Erro ao fazer requisição: {e}")
 
 
 def test_invalid_payload():
     """Testa webhook com payload inválido."""
-    print("\n" + "=" * 60)
-    print("TESTE 3: Payload inválido (sem array statuses)")
-    print("=" * 60)
-
     invalid_payload = {"account": {"id": "xxx"}, "bot": {"id": "yyy"}}
+    response, error = _post(invalid_payload)
 
-    try:
-        response = requests.post(
-            WEBHOOK_URL,
-            json=invalid_payload,
-            headers={"Content-Type": "application/json"},
-        )
+    with PRINT_LOCK:
+        print("\n" + "=" * 60)
+        print("TESTE 3: Payload inválido (sem array statuses)")
+        print("=" * 60)
 
-        print(f"\nStatus Code: {response.status_code}")
-        print("Response:")
-        print(json.dumps(response.json(), indent=2, ensure_ascii=False))
+        try:
+            if error:
+                raise error
 
-        if response.status_code == 400:
-            print("\n✅ Teste passou! (erro 400 esperado)")
-        else:
-            print("\n❌ Teste falhou! (esperava-se erro 400)")
+            _print_response(response)
 
-    except Exception as e:
-        print(f"\n❌ Erro ao fazer requisição: {e}")
+            if response.status_code == 400:
+                print("\n✅ Teste passou! (erro 400 esperado)")
+            else:
+                print("\n❌ Teste falhou! (esperava-se erro 400)")
+
+        except Exception as e:
+            print(f"\n❌ Erro ao fazer requisição: {e}")
 
 
 if __name__ == "__main__":
@@ -175,10 +194,10 @@ if __name__ == "__main__":
 
     input("\nPressione ENTER para continuar...")
 
-    # Executar testes
-    test_single_status()
-    test_multiple_statuses()
-    test_invalid_payload()
+    # Executar testes em paralelo
+    tests = [test_single_status, test_multiple_statuses, test_invalid_payload]
+    with ThreadPoolExecutor(max_workers=len(tests)) as executor:
+        list(executor.map(lambda test: test(), tests))
 
     print("\n" + "=" * 60)
     print("TESTES CONCLUÍDOS")
@@ -1,6 +1,52 @@
-from django.contrib import admin
+from datetime import timedelta
+
+from django.contrib import admin, messages
+from django.utils import timezone
+from django.utils.html import format_html
 from .models import MessageLog, ApiToken, ApiRequestLog, DeliveryWebhookLog
 
+# Badges do status de encaminhamento, montados uma única vez no import
+_BADGES = {
+    "success": format_html(
+        '<span style="color:green;font-weight:bold">{}</span>', "✅ Sucesso"
+    ),
+    "failed": format_html(
+        '<span style="color:red;font-weight:bold">{}</span>', "❌ Falha"
+    ),
+    "pending": format_html(
+        '<span style="color:orange;font-weight:bold">{}</span>', "⏳ Pendente"
+    ),
+    "forwarding": format_html(
+        '<span style="color:orange;font-weight:bold">{}</span>', "📤 Encaminhando"
+    ),
+}
+_BADGE_DEFAULT = format_html('<span style="color:gray">{}</span>', "❓ N/A")
+
+
+class RecentFilter(admin.SimpleListFilter):
+    """
+    Filtro por período fixo em created_at. Substitui o filtro de data padrão,
+    que consulta as datas distintas da tabela a cada carregamento da página.
+    """
+
+    title = "Período"
+    parameter_name = "periodo"
+
+    def lookups(self, request, model_admin):
+        return [
+            ("1", "Últimas 24h"),
+            ("7", "Últimos 7 dias"),
+            ("30", "Últimos 30 dias"),
+        ]
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value not in ("1", "7", "30"):
+            return queryset
+        return queryset.filter(
+            created_at__gte=timezone.now() - timedelta(days=int(value))
+        )
+
 
 # Configuração existente do MessageLog (manter)
 @admin.register(MessageLog)
@@ -10,15 +56,17 @@ class MessageLogAdmin(admin.ModelAdmin):
         "phone",
         "message_preview",
         "is_group",
-        "external_system_status",
+        "forwarding_status_badge",
     )
     list_filter = (
         "is_group",
         "broadcast",
         "external_system_status",
-        "created_at",
+        RecentFilter,
     )
-    search_fields = ("phone", "message", "message_id")
+    # "=" faz comparação exata (iexact) em vez de ILIKE '%termo%' para campos
+    # que são sempre buscados pelo valor completo
+    search_fields = ("phone", "message", "=message_id", "=external_system_status")
     readonly_fields = (
         "created_at",
         "message_id",
@@ -33,11 +81,22 @@ class MessageLogAdmin(admin.ModelAdmin):
     )
     ordering = ("-created_at",)
 
+    def get_queryset(self, request):
+        # A listagem não exibe a resposta do sistema externo; a página de
+        # detalhe carrega o campo adiado sob demanda
+        return super().get_queryset(request).defer("external_system_response")
+
     def message_preview(self, obj):
         return obj.message[:50] + "..." if len(obj.message) > 50 else obj.message
 
     message_preview.short_description = "Mensagem"
 
+    def forwarding_status_badge(self, obj):
+        return _BADGES.get(obj.external_system_status, _BADGE_DEFAULT)
+
+    forwarding_status_badge.short_description = "Encaminhamento"
+    forwarding_status_badge.admin_order_field = "external_system_status"
+
 
 # ADICIONAR CONFIGURAÇÃO PARA ApiToken
 @admin.register(ApiToken)
@@ -51,16 +110,16 @@ class ApiTokenAdmin(admin.ModelAdmin):
         "last_used",
     )
     list_filter = ("is_active", "created_at", "last_used")
-    search_fields = ("name", "token")
-    readonly_fields = ("token", "created_at", "last_used")
+    search_fields = ("name",)
+    readonly_fields = ("created_at", "last_used")
 
     fieldsets = (
-        ("Informações Básicas", {"fields": ("name", "is_active")}),
         (
-            "Token",
+            "Informações Básicas",
             {
-                "fields": ("token",),
-                "description": "Token gerado automaticamente. Copie e guarde em local seguro.",
+                "fields": ("name", "is_active"),
+                "description": "O token é gerado ao salvar e exibido uma única vez. "
+                "Copie e guarde em local seguro.",
             },
         ),
         (
@@ -73,7 +132,9 @@ class ApiTokenAdmin(admin.ModelAdmin):
     )
 
     def token_preview(self, obj):
-        return f"{obj.token[:20]}..." if obj.token else "-"
+        # Apenas o hash é armazenado; o token só existe logo após a criação
+        raw_token = getattr(obj, "_raw_token", None)
+        return f"{raw_token[:20]}..." if raw_token else "(oculto)"
 
     token_preview.short_description = "Token (Preview)"
 
@@ -81,6 +142,14 @@ class ApiTokenAdmin(admin.ModelAdmin):
         if not change:  # Se está criando novo token
             obj.created_by = request.user
         super().save_model(request, obj, form, change)
+        raw_token = getattr(obj, "_raw_token", None)
+        if raw_token:
+            self.message_user(
+                request,
+                f"Token gerado para {obj.name}: {raw_token} — copie agora, "
+                "ele não será exibido novamente.",
+                messages.WARNING,
+            )
 
 
 # ADICIONAR CONFIGURAÇÃO PARA ApiRequestLog
@@ -98,7 +167,7 @@ class ApiRequestLogAdmin(admin.ModelAdmin):
     list_filter = (
         "request_status",
         "response_status",
-        "created_at",
+        RecentFilter,
         "api_token",
     )
     search_fields = ("ip_address", "carga_number")
@@ -116,6 +185,14 @@ class ApiRequestLogAdmin(admin.ModelAdmin):
     )
     ordering = ("-created_at",)
 
+    def get_queryset(self, request):
+        # Campos de texto longos não aparecem na listagem
+        return (
+            super()
+            .get_queryset(request)
+            .defer("internal_system_response", "response_message")
+        )
+
     def has_add_permission(self, request):
         # Não permitir adicionar manualmente
         return False
@@ -135,7 +212,7 @@ class DeliveryWebhookLogAdmin(admin.ModelAdmin):
         "ip_address",
         "processing_time_ms",
     )
-    list_filter = ("webhook_status", "created_at")
+    list_filter = ("webhook_status", RecentFilter)
     search_fields = ("message_id", "delivery_message", "ip_address")
     readonly_fields = (
         "created_at",
@@ -151,6 +228,14 @@ class DeliveryWebhookLogAdmin(admin.ModelAdmin):
     date_hierarchy = "created_at"
     ordering = ("-created_at",)
 
+    def get_queryset(self, request):
+        # Payload bruto e resposta da rota interna não aparecem na listagem
+        return (
+            super()
+            .get_queryset(request)
+            .defer("raw_payload", "internal_route_response")
+        )
+
     def has_add_permission(self, request):
         # Não permitir criação manual (apenas via webhook)
         return False
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ZapiWebhookConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "zapi_webhook"
+
+    def ready(self):
+        from . import signals  # noqa: F401
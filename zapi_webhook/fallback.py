@@ -0,0 +1,248 @@
+import logging
+import random
+import time
+from functools import lru_cache
+from typing import Optional, Union
+
+from django.conf import settings
+from django.core.cache import cache
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+logger = logging.getLogger(__name__)
+
+# Espera (segundos) antes de tentar a próxima URL do fallback: exponencial a
+# partir de FALLBACK_BACKOFF_BASE, limitada a FALLBACK_BACKOFF_CAP
+FALLBACK_BACKOFF_BASE = getattr(settings, "FALLBACK_BACKOFF_BASE", 0.1)
+FALLBACK_BACKOFF_CAP = getattr(settings, "FALLBACK_BACKOFF_CAP", 2.0)
+
+# Retentativas curtas para falhas transitórias (conexão e 502/503/504) antes
+# de passar para a próxima URL do fallback. Só o GET é repetido após 502/503/
+# 504; o POST (encaminhamentos) só é repetido em falha de conexão, quando a
+# requisição não chegou ao destino, para não gerar entregas duplicadas.
+# Retry-After é tratado entre as URLs (com limite) por try_urls_with_cache, e
+# não aqui, onde o urllib3 esperaria o valor inteiro. raise_on_status=False
+# devolve a última resposta em vez de levantar RetryError. Timeouts de
+# leitura não são repetidos (read=False): chegam como
+# requests.exceptions.ReadTimeout, e não como ConnectionError, e não
+# multiplicam o timeout de cada URL.
+_retry = Retry(
+    total=2,
+    read=False,
+    backoff_factor=0.1,
+    status_forcelist=[502, 503, 504],
+    allowed_methods=frozenset({"GET"}),
+    respect_retry_after_header=False,
+    raise_on_status=False,
+)
+
+# Sessão compartilhada: reaproveita conexões TCP/TLS entre as requisições
+# para os sistemas externos (keep-alive) em vez de abrir uma por chamada.
+http_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=64, pool_maxsize=100, max_retries=_retry)
+http_session.mount("http://", _adapter)
+http_session.mount("https://", _adapter)
+
+
+@lru_cache(maxsize=32)
+def parse_urls(urls_string: str) -> tuple[str, ...]:
+    """
+    Converte uma string de URLs separadas por vírgula em uma tupla,
+    adicionando http:// às URLs sem protocolo.
+
+    O resultado (imutável) fica em cache: as strings vêm das configurações e
+    não mudam em tempo de execução.
+    """
+    urls = (url.strip() for url in urls_string.split(","))
+    return tuple(
+        url if url.startswith(("http://", "https://")) else f"http://{url}"
+        for url in urls
+        if url
+    )
+
+
+def jittered_timeout(timeout: int) -> int:
+    """
+    Varia o tempo de cache em ±10%, para que entradas gravadas juntas (ex.:
+    após um deploy ou num pico) não expirem todas no mesmo instante.
+    """
+    return max(1, round(timeout * random.uniform(0.9, 1.1)))
+
+
+def _backoff_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """
+    Tempo de espera antes da próxima URL após `attempt` falhas: o Retry-After
+    do servidor (em segundos) quando informado, senão exponencial com jitter.
+    Sempre limitado a FALLBACK_BACKOFF_CAP.
+    """
+    if retry_after and retry_after.strip().isdigit():
+        return min(FALLBACK_BACKOFF_CAP, float(retry_after))
+    delay = min(FALLBACK_BACKOFF_CAP, FALLBACK_BACKOFF_BASE * 2 ** (attempt - 1))
+    return delay + random.uniform(0, FALLBACK_BACKOFF_BASE)
+
+
+def try_urls_with_cache(
+    urls_string: Union[str, tuple[str, ...]],
+    method: str = "GET",
+    timeout: int = 10,
+    cache_key: str = "default",
+    cache_timeout: int = 300,
+    **kwargs,
+) -> requests.Response:
+    """
+    Tenta fazer requisição HTTP em múltiplas URLs com sistema de cache inteligente.
+
+    O sistema tenta primeiro a URL que funcionou anteriormente (cache), depois tenta
+    todas as URLs em ordem até encontrar uma que funcione.
+
+    Args:
+        urls_string: String com URLs separadas por vírgula (ex: "127.0.0.1:8003,192.168.1.100:8004")
+            ou tupla já processada por parse_urls()
+        method: Método HTTP (GET, POST, etc)
+        timeout: Timeout por tentativa em segundos
+        cache_key: Chave única para identificar este grupo de URLs no cache
+        cache_timeout: Tempo em segundos que a URL bem-sucedida fica em cache (padrão: 5min)
+        **kwargs: Argumentos adicionais para requests (json, headers, etc)
+
+    Returns:
+        requests.Response: Resposta da requisição bem-sucedida
+
+    Raises:
+        requests.exceptions.RequestException: Se todas as URLs falharem
+    """
+    if isinstance(urls_string, str):
+        urls = parse_urls(urls_string)
+    else:
+        urls = urls_string
+
+    if not urls:
+        raise ValueError("Nenhuma URL válida fornecida")
+
+    # Tentar obter do cache a posição da URL que funcionou por último. Guardar a
+    # posição (e não a URL) permite reaproveitar o cache quando as URLs variam
+    # por requisição, como na consulta de carga.
+    cache_full_key = f"url_fallback_{cache_key}"
+    cached_index = cache.get(cache_full_key)
+    if not isinstance(cached_index, int) or not 0 <= cached_index < len(urls):
+        cached_index = None
+
+    # Lista de URLs para tentar (cache primeiro, depois as outras)
+    if cached_index is not None:
+        indexes_to_try = [cached_index]
+        # Adicionar as outras URLs (sem repetir a do cache)
+        indexes_to_try.extend(i for i in range(len(urls)) if i != cached_index)
+        logger.debug("Fallback: Tentando primeiro URL do cache: %s", urls[cached_index])
+    else:
+        indexes_to_try = range(len(urls))
+        logger.debug("Fallback: Cache vazio ou inválido, tentando URLs em ordem")
+
+    last_exception = None
+    # Timeout de leitura em alguma URL: a requisição chegou ao servidor e pode
+    # ter sido processada. Tem prioridade na exceção final, para que quem
+    # chama não a repita como se fosse uma falha de conexão
+    read_timeout = None
+    failed_urls = []
+    retry_after = None
+
+    # Tentar cada URL
+    for i, url_index in enumerate(indexes_to_try, 1):
+        url = urls[url_index]
+
+        # Esperar antes de passar para a próxima URL, para não repetir a
+        # requisição em todas as URLs de uma vez durante uma instabilidade
+        if i > 1:
+            delay = _backoff_delay(i - 1, retry_after)
+            retry_after = None
+            if delay > 0:
+                time.sleep(delay)
+
+        try:
+            logger.info("Fallback: Tentativa %d/%d - URL: %s", i, len(urls), url)
+            start_ns = time.perf_counter_ns()
+
+            # Fazer requisição
+            response = http_session.request(
+                method=method, url=url, timeout=timeout, **kwargs
+            )
+
+            elapsed_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
+
+            # Verificar se foi bem-sucedido (status 2xx ou 3xx)
+            if 200 <= response.status_code < 400:
+                logger.info(
+                    "Fallback: ✓ Sucesso com URL %s - Status: %d - Tempo: %dms",
+                    url,
+                    response.status_code,
+                    elapsed_ms,
+                )
+
+                # Salvar no cache
+                if url_index != cached_index:
+                    cache.set(
+                        cache_full_key, url_index, jittered_timeout(cache_timeout)
+                    )
+                    logger.info(
+                        "Fallback: URL %s salva no cache por %ss", url, cache_timeout
+                    )
+
+                # Log de falhas anteriores (se houver)
+                if failed_urls:
+                    logger.warning(
+                        f"Fallback: URLs que falharam antes do sucesso: {', '.join(failed_urls)}"
+                    )
+
+                return response
+            else:
+                # Status de erro HTTP
+                failed_urls.append(url)
+                logger.warning(
+                    f"Fallback: ✗ URL {url} retornou status {response.status_code} - "
+                    f"Tempo: {elapsed_ms}ms"
+                )
+                last_exception = requests.exceptions.HTTPError(
+                    f"HTTP {response.status_code}", response=response
+                )
+                if response.status_code in (429, 503):
+                    retry_after = response.headers.get("Retry-After")
+
+        except requests.exceptions.Timeout as e:
+            failed_urls.append(url)
+            elapsed_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
+            logger.warning(f"Fallback: ✗ Timeout na URL {url} após {elapsed_ms}ms")
+            # Mantém o tipo (ConnectTimeout / ReadTimeout) para quem chama
+            last_exception = type(e)(f"Timeout ao acessar {url}")
+            if isinstance(e, requests.exceptions.ReadTimeout):
+                read_timeout = last_exception
+
+        except requests.exceptions.ConnectionError as e:
+            failed_urls.append(url)
+            logger.warning(f"Fallback: ✗ Erro de conexão na URL {url}: {str(e)[:100]}")
+            last_exception = e
+
+        except requests.exceptions.RequestException as e:
+            failed_urls.append(url)
+            logger.warning(f"Fallback: ✗ Erro na URL {url}: {str(e)[:100]}")
+            last_exception = e
+
+    # Se chegou aqui, todas as URLs falharam
+    logger.error(
+        f"Fallback: ✗✗✗ TODAS as {len(urls)} URLs falharam! "
+        f"URLs tentadas: {', '.join(failed_urls)}"
+    )
+
+    # Limpar cache se todas falharam
+    if cached_index is not None:
+        cache.delete(cache_full_key)
+        logger.info("Fallback: Cache limpo devido a falhas consecutivas")
+
+    # Levantar o timeout de leitura, se houve, ou a última exceção
+    if read_timeout:
+        raise read_timeout
+    if last_exception:
+        raise last_exception
+    else:
+        raise requests.exceptions.RequestException(
+            f"Todas as URLs falharam: {', '.join(failed_urls)}"
+        )
@@ -0,0 +1,121 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+
+logger = logging.getLogger(__name__)
+
+# Limites do lote: grava quando acumular BATCH_SIZE registros ou quando
+# FLUSH_INTERVAL segundos se passarem desde o primeiro item do lote
+BATCH_SIZE = getattr(settings, "LOG_BATCH_SIZE", 100)
+FLUSH_INTERVAL = getattr(settings, "LOG_FLUSH_INTERVAL", 0.5)
+
+# Registros aguardando gravação; acima disso (banco lento ou fora do ar) os
+# novos são descartados em vez de acumular memória ou bloquear a requisição
+QUEUE_MAXSIZE = getattr(settings, "LOG_QUEUE_MAXSIZE", 10000)
+
+# Tempo máximo (segundos) aguardando a gravação do último lote ao encerrar
+SHUTDOWN_TIMEOUT = 5
+
+_queue = queue.Queue(maxsize=QUEUE_MAXSIZE)
+_STOP = object()
+_worker = None
+_worker_lock = threading.Lock()
+_dropped = 0
+
+
+def enqueue(obj):
+    """
+    Agenda a gravação de uma instância de modelo (ainda não salva).
+
+    As instâncias são agrupadas por modelo e gravadas com bulk_create por
+    uma thread em segundo plano, fora do ciclo requisição/resposta. Com a
+    fila cheia o registro é descartado (e contabilizado), sem bloquear.
+    """
+    global _dropped
+    _ensure_worker()
+    try:
+        _queue.put_nowait(obj)
+    except queue.Full:
+        _dropped += 1
+
+
+def _ensure_worker():
+    # A thread é iniciada na primeira gravação (e não no import) para que
+    # cada processo do Gunicorn tenha a sua, mesmo com preload
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(
+                target=_drain, name="zapi-logbatcher", daemon=True
+            )
+            _worker.start()
+
+
+def _drain():
+    stop = False
+    while not stop:
+        item = _queue.get()
+        items = []
+        deadline = time.monotonic() + FLUSH_INTERVAL
+        while True:
+            if item is _STOP:
+                stop = True
+                break
+            items.append(item)
+            if len(items) >= BATCH_SIZE:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = _queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+        if items:
+            _flush(items)
+        _report_dropped()
+
+
+def _report_dropped():
+    # Um aviso por lote (e não por registro) enquanto houver descartes
+    global _dropped
+    if _dropped:
+        dropped, _dropped = _dropped, 0
+        logger.warning(f"Fila de logs cheia: {dropped} registros descartados")
+
+
+@atexit.register
+def _shutdown():
+    # No encerramento do processo (ex.: restart gracioso do Gunicorn) grava o
+    # que ainda estiver na fila em vez de perder com a thread daemon
+    worker = _worker
+    if worker is None or not worker.is_alive():
+        return
+    try:
+        _queue.put(_STOP, timeout=SHUTDOWN_TIMEOUT)
+    except queue.Full:
+        return
+    worker.join(SHUTDOWN_TIMEOUT)
+
+
+def _flush(items: list):
+    close_old_connections()
+    by_model = {}
+    for obj in items:
+        by_model.setdefault(type(obj), []).append(obj)
+    for model, objs in by_model.items():
+        try:
+            model.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+        except Exception as e:
+            # Perda limitada ao lote: os logs não devem derrubar a thread
+            logger.error(
+                f"Erro ao gravar lote de {len(objs)} registros de {model.__name__}: {e}"
+            )
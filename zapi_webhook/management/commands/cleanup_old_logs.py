@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from zapi_webhook import tasks
+
+
+class Command(BaseCommand):
+    help = (
+        "Remove mensagens, logs da API e logs de delivery antigos conforme "
+        "os períodos de retenção configurados"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=tasks.CLEANUP_BATCH_SIZE,
+            help="Quantidade máxima de registros removidos por DELETE "
+            "(padrão: CLEANUP_BATCH_SIZE)",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        messages = tasks.cleanup_old_messages(batch_size=batch_size)
+        api_requests = tasks.cleanup_old_api_requests(batch_size=batch_size)
+        delivery_logs = tasks.cleanup_old_delivery_logs(batch_size=batch_size)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{messages} mensagens, {api_requests} logs de API e "
+                f"{delivery_logs} logs de delivery removidos"
+            )
+        )
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from zapi_webhook import tasks
+
+
+class Command(BaseCommand):
+    help = "Reenvia à rota interna os status de entrega pendentes por falha de rede"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-age",
+            type=int,
+            default=60,
+            help="Idade máxima (minutos) para reenvio; mais antigos viram 'forward_error'",
+        )
+        parser.add_argument(
+            "--min-age",
+            type=int,
+            default=1,
+            help="Idade mínima (minutos) para considerar o status no reenvio",
+        )
+
+    def handle(self, *args, **options):
+        retried, expired = tasks.retry_pending_deliveries(
+            max_age_minutes=options["max_age"],
+            min_age_minutes=options["min_age"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"{retried} status reenviados, {expired} expirados")
+        )
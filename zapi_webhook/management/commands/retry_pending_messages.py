@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from zapi_webhook import tasks
+
+
+class Command(BaseCommand):
+    help = "Reenvia ao sistema externo as mensagens pendentes por falha de rede"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-age",
+            type=int,
+            default=60,
+            help="Idade máxima (minutos) para reenvio; mais antigas viram 'failed'",
+        )
+        parser.add_argument(
+            "--min-age",
+            type=int,
+            default=1,
+            help="Idade mínima (minutos) para considerar a mensagem no reenvio",
+        )
+
+    def handle(self, *args, **options):
+        retried, expired = tasks.retry_pending_messages(
+            max_age_minutes=options["max_age"],
+            min_age_minutes=options["min_age"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"{retried} mensagens reenviadas, {expired} expiradas")
+        )
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.23 on 2026-10-15 22:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("zapi_webhook", "0004_deliverywebhooklog"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="apirequestlog",
+            index=models.Index(
+                fields=["api_token", "-created_at"], name="apireqlog_token_ct_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="messagelog",
+            index=models.Index(
+                fields=["external_system_status", "-created_at"],
+                name="msglog_status_ct_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,57 @@
+import hashlib
+import secrets
+
+from django.db import migrations, models
+
+
+def hash_existing_tokens(apps, schema_editor):
+    ApiToken = apps.get_model("zapi_webhook", "ApiToken")
+    for api_token in ApiToken.objects.all():
+        api_token.token_hash = hashlib.sha256(api_token.token.encode()).digest()
+        api_token.save(update_fields=["token_hash"])
+
+
+def restore_token_placeholders(apps, schema_editor):
+    # O token original não pode ser recuperado a partir do hash: ao reverter,
+    # cada token recebe um valor aleatório (na prática, fica revogado) e deve
+    # ser gerado novamente no admin
+    ApiToken = apps.get_model("zapi_webhook", "ApiToken")
+    for api_token in ApiToken.objects.all():
+        api_token.token = secrets.token_urlsafe(32)
+        api_token.save(update_fields=["token"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("zapi_webhook", "0005_apirequestlog_apireqlog_token_ct_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="apitoken",
+            name="token_hash",
+            field=models.BinaryField(editable=False, max_length=32, null=True),
+        ),
+        # Token opcional antes da remoção, para que a reversão possa recriar a
+        # coluna e preenchê-la com restore_token_placeholders
+        migrations.AlterField(
+            model_name="apitoken",
+            name="token",
+            field=models.CharField(editable=False, max_length=64, null=True),
+        ),
+        migrations.RunPython(hash_existing_tokens, restore_token_placeholders),
+        migrations.RemoveField(
+            model_name="apitoken",
+            name="token",
+        ),
+        migrations.AlterField(
+            model_name="apitoken",
+            name="token_hash",
+            field=models.BinaryField(
+                editable=False,
+                help_text="Hash SHA-256 do token gerado automaticamente",
+                max_length=32,
+                unique=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.23 on 2026-10-15 23:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("zapi_webhook", "0006_apitoken_token_hash"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="messagelog",
+            index=models.Index(
+                fields=["created_at", "external_system_status"],
+                name="msglog_ct_status_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.23 on 2026-10-15 23:04
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_messages(apps, schema_editor):
+    # Mantém o primeiro registro de cada message_id repetido
+    MessageLog = apps.get_model("zapi_webhook", "MessageLog")
+    duplicates = (
+        MessageLog.objects.exclude(message_id="")
+        .values("message_id")
+        .annotate(first_pk=Min("pk"), total=Count("pk"))
+        .filter(total__gt=1)
+    )
+    for duplicate in duplicates:
+        MessageLog.objects.filter(message_id=duplicate["message_id"]).exclude(
+            pk=duplicate["first_pk"]
+        ).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("zapi_webhook", "0007_messagelog_dashboard_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_messages, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="messagelog",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("message_id", ""), _negated=True),
+                fields=("message_id",),
+                name="msglog_message_id_uniq",
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-15 23:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("zapi_webhook", "0008_messagelog_message_id_uniq"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="apirequestlog",
+            index=models.Index(
+                fields=["request_status", "-created_at"], name="apireqlog_status_ct_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.23 on 2026-10-15 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("zapi_webhook", "0009_apirequestlog_status_ct_idx"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="apirequestlog",
+            name="request_status",
+            field=models.CharField(
+                choices=[
+                    ("success", "Sucesso"),
+                    ("invalid_token", "Token Inválido"),
+                    ("invalid_input", "Entrada Inválida"),
+                    ("system_error", "Erro do Sistema"),
+                    ("timeout", "Timeout"),
+                    ("connection_error", "Erro de Conexão"),
+                    ("rate_limited", "Rate Limit Excedido"),
+                    ("cached_error", "Erro em Cache"),
+                ],
+                db_index=True,
+                help_text="Status da requisição",
+                max_length=50,
+            ),
+        ),
+    ]
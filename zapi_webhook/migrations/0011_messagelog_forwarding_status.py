@@ -0,0 +1,22 @@
+# Generated by Django 4.2.23 on 2026-10-15 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("zapi_webhook", "0010_apirequestlog_cached_error"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="messagelog",
+            name="external_system_status",
+            field=models.CharField(
+                blank=True,
+                help_text="Status do reencaminhamento (success, failed, pending, forwarding)",
+                max_length=50,
+                null=True,
+            ),
+        ),
+    ]
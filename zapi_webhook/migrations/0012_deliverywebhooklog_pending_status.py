@@ -0,0 +1,29 @@
+# Generated by Django 4.2.23 on 2026-10-15 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("zapi_webhook", "0011_messagelog_forwarding_status"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="deliverywebhooklog",
+            name="webhook_status",
+            field=models.CharField(
+                choices=[
+                    ("success", "Sucesso - Encaminhado"),
+                    ("not_found", "ID não encontrado (404)"),
+                    ("forward_error", "Erro ao encaminhar"),
+                    ("invalid_payload", "Payload inválido"),
+                    ("pending", "Pendente"),
+                    ("forwarding", "Encaminhando"),
+                ],
+                db_index=True,
+                help_text="Status do processamento do webhook",
+                max_length=50,
+            ),
+        ),
+    ]
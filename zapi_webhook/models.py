@@ -1,4 +1,5 @@
 from django.db import models
+import hashlib
 import secrets
 from django.contrib.auth.models import User
 
@@ -16,7 +17,7 @@ class MessageLog(models.Model):
         max_length=50,
         blank=True,
         null=True,
-        help_text="Status do reencaminhamento (success, failed, pending)",
+        help_text="Status do reencaminhamento (success, failed, pending, forwarding)",
     )
     external_system_response = models.TextField(
         blank=True, null=True, help_text="Resposta do sistema externo"
@@ -30,6 +31,26 @@ class MessageLog(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["external_system_status", "-created_at"],
+                name="msglog_status_ct_idx",
+            ),
+            # Listagens e filtros de período do dashboard (o índice atende
+            # também a ordenação por -created_at, percorrido ao contrário)
+            models.Index(
+                fields=["created_at", "external_system_status"],
+                name="msglog_ct_status_idx",
+            ),
+        ]
+        constraints = [
+            # Reentregas do mesmo webhook pelo Z-API não geram linha duplicada
+            models.UniqueConstraint(
+                fields=["message_id"],
+                condition=~models.Q(message_id=""),
+                name="msglog_message_id_uniq",
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"{self.created_at} | {self.phone} | {self.message[:40]}"
@@ -46,12 +67,11 @@ class ApiToken(models.Model):
         unique=True,
         help_text="Nome identificador do token (ex: Sistema XYZ)",
     )
-    token = models.CharField(
-        max_length=64,
+    token_hash = models.BinaryField(
+        max_length=32,
         unique=True,
-        db_index=True,
         editable=False,
-        help_text="Token gerado automaticamente",
+        help_text="Hash SHA-256 do token gerado automaticamente",
     )
     is_active = models.BooleanField(default=True, help_text="Token ativo ou revogado")
     created_at = models.DateTimeField(auto_now_add=True)
@@ -71,10 +91,21 @@ class ApiToken(models.Model):
         verbose_name = "Token de API"
         verbose_name_plural = "Tokens de API"
 
+    @staticmethod
+    def hash_token(raw_token: str) -> bytes:
+        return hashlib.sha256(raw_token.encode()).digest()
+
+    @staticmethod
+    def cache_key(token_hash: bytes) -> str:
+        # Chave do cache da busca de token usada na validação da API
+        return "apitoken:" + bytes(token_hash).hex()
+
     def save(self, *args, **kwargs):
-        if not self.token:
-            # Gerar token seguro de 64 caracteres
-            self.token = secrets.token_urlsafe(48)
+        if not self.token_hash:
+            # Gerar token seguro de 64 caracteres; apenas o hash é persistido.
+            # O valor original fica disponível em _raw_token só nesta instância.
+            self._raw_token = secrets.token_urlsafe(48)
+            self.token_hash = self.hash_token(self._raw_token)
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -95,6 +126,7 @@ class ApiRequestLog(models.Model):
         ("timeout", "Timeout"),
         ("connection_error", "Erro de Conexão"),
         ("rate_limited", "Rate Limit Excedido"),
+        ("cached_error", "Erro em Cache"),
     ]
 
     # Informações da requisição
@@ -149,6 +181,15 @@ class ApiRequestLog(models.Model):
         ordering = ["-created_at"]
         verbose_name = "Log de Requisição API"
         verbose_name_plural = "Logs de Requisições API"
+        indexes = [
+            models.Index(
+                fields=["api_token", "-created_at"], name="apireqlog_token_ct_idx"
+            ),
+            models.Index(
+                fields=["request_status", "-created_at"],
+                name="apireqlog_status_ct_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.created_at} | {self.ip_address} | Carga: {self.carga_number} | {self.request_status}"
@@ -165,6 +206,8 @@ class DeliveryWebhookLog(models.Model):
         ("not_found", "ID não encontrado (404)"),
         ("forward_error", "Erro ao encaminhar"),
         ("invalid_payload", "Payload inválido"),
+        ("pending", "Pendente"),
+        ("forwarding", "Encaminhando"),
     ]
 
     # Dados do callback recebido
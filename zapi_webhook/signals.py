@@ -0,0 +1,25 @@
+import logging
+
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import ApiToken
+
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=ApiToken)
+@receiver(post_delete, sender=ApiToken)
+def invalidate_api_token_cache(sender, instance, **kwargs):
+    """
+    Remove do cache a busca do token alterado ou excluído, para que uma
+    revogação tenha efeito imediato na API.
+    """
+    if not instance.token_hash:
+        return
+    try:
+        cache.delete(ApiToken.cache_key(instance.token_hash))
+    except Exception as e:
+        logger.warning(f"Não foi possível invalidar o cache do token: {e}")
@@ -0,0 +1,512 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .fallback import http_session, parse_urls, try_urls_with_cache
+from .models import ApiRequestLog, DeliveryWebhookLog, MessageLog
+
+
+logger = logging.getLogger(__name__)
+
+# URLs do sistema externo, processadas uma única vez
+EXTERNAL_URLS = parse_urls(getattr(settings, "EXTERNAL_SYSTEM_URL", ""))
+EXTERNAL_SYSTEM_TIMEOUT = getattr(settings, "EXTERNAL_SYSTEM_TIMEOUT", 10)
+
+# Rota interna que recebe os status de entrega
+INTERNAL_STATUS_URL = (
+    getattr(settings, "INTERNAL_SYSTEM_URL", "http://127.0.0.1:8000")
+    + "/atualizaretornomensagemporid/"
+)
+INTERNAL_FORWARD_TIMEOUT = getattr(settings, "INTERNAL_FORWARD_TIMEOUT", 10)
+
+# Retentativas em processo após falha de rede (atraso: base * 2^tentativa)
+FORWARD_MAX_RETRIES = getattr(settings, "FORWARD_MAX_RETRIES", 3)
+FORWARD_RETRY_BACKOFF = getattr(settings, "FORWARD_RETRY_BACKOFF", 2)
+
+# Registros removidos por DELETE na limpeza de logs antigos
+CLEANUP_BATCH_SIZE = getattr(settings, "CLEANUP_BATCH_SIZE", 5000)
+
+# Pool de threads para processar os webhooks fora do ciclo requisição/resposta.
+# Os webhooks só validam e persistem o payload; o encaminhamento roda aqui.
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, "BACKGROUND_WORKERS", 4),
+    thread_name_prefix="zapi-webhook",
+)
+
+
+def enqueue(func, *args) -> Future:
+    """
+    Agenda a execução de func(*args) em segundo plano.
+    """
+    return _executor.submit(_run_task, func, *args)
+
+
+def _run_task(func, *args):
+    # Cada thread do pool mantém sua própria conexão com o banco
+    close_old_connections()
+    try:
+        func(*args)
+    except Exception as e:
+        logger.error(f"Erro na tarefa em segundo plano {func.__name__}: {e}")
+    finally:
+        close_old_connections()
+
+
+def enqueue_later(delay: float, func, *args):
+    """
+    Agenda func(*args) no pool de segundo plano após delay segundos.
+    """
+    timer = threading.Timer(delay, enqueue, args=(func, *args))
+    timer.daemon = True
+    timer.start()
+
+
+def forward_message(message_log_id: int, attempt: int = 0):
+    """
+    Encaminha uma mensagem registrada em MessageLog para o sistema externo
+    e grava o resultado do encaminhamento.
+
+    Em falha de conexão (a mensagem não chegou ao destino), reagenda o
+    encaminhamento com backoff exponencial até FORWARD_MAX_RETRIES vezes;
+    depois disso a mensagem fica pendente para o comando
+    retry_pending_messages. Timeouts de leitura, rejeições do sistema externo
+    (erro HTTP) e demais erros são gravados como falha, sem reenvio.
+
+    Antes do envio a mensagem é reservada (pending -> forwarding) com um
+    UPDATE condicional: só quem a reservou envia, então uma retentativa em
+    processo e o cron nunca enviam a mesma mensagem ao mesmo tempo.
+    """
+    claimed = MessageLog.objects.filter(
+        pk=message_log_id, external_system_status="pending"
+    ).update(external_system_status="forwarding")
+    if not claimed:
+        logger.info(
+            "MessageLog %s já encaminhado ou em encaminhamento; envio ignorado",
+            message_log_id,
+        )
+        return
+
+    try:
+        message_log = MessageLog.objects.only(
+            "message_id", "is_group", "phone", "message", "broadcast"
+        ).get(pk=message_log_id)
+    except MessageLog.DoesNotExist:
+        logger.warning(
+            f"MessageLog {message_log_id} não encontrado para encaminhamento"
+        )
+        return
+
+    message_id = message_log.message_id
+    retry_delay = None
+
+    try:
+        forward_data = {
+            "is_group": message_log.is_group,
+            "message_id": message_id,
+            "phone": message_log.phone,
+            "message": message_log.message,
+            "broadcast": message_log.broadcast,
+        }
+
+        # Usar sistema de fallback com múltiplas URLs
+        response = try_urls_with_cache(
+            urls_string=EXTERNAL_URLS,
+            method="POST",
+            timeout=EXTERNAL_SYSTEM_TIMEOUT,
+            cache_key="external_system",
+            cache_timeout=300,  # 5 minutos
+            json=forward_data,
+        )
+
+        # Update database with forwarding results (apenas as colunas alteradas)
+        if response.status_code == 200:
+            updates = {
+                "external_system_status": "success",
+                "external_system_response": response.text[:500],  # Limit size
+            }
+            logger.info(
+                "Data forwarded successfully to external system: %s", message_id
+            )
+        else:
+            updates = {
+                "external_system_status": "failed",
+                "external_system_response": f"HTTP {response.status_code}: {response.text[:500]}",
+            }
+            logger.warning(
+                f"Failed to forward data to external system. Status: {response.status_code}, Response: {response.text}"
+            )
+        updates["external_system_status_code"] = response.status_code
+        updates["forwarded_at"] = timezone.now()
+
+    except requests.exceptions.HTTPError as e:
+        # Todas as URLs responderam com erro HTTP: rejeição do sistema
+        # externo, registrada como falha (sem reenvio)
+        status_code = e.response.status_code if e.response is not None else None
+        response_text = e.response.text[:500] if e.response is not None else ""
+        updates = {
+            "external_system_status": "failed",
+            "external_system_status_code": status_code,
+            "external_system_response": f"HTTP {status_code}: {response_text}",
+            "forwarded_at": timezone.now(),
+        }
+        logger.warning(
+            f"Failed to forward data to external system. Status: {status_code}, Response: {response_text}"
+        )
+
+    except requests.exceptions.ReadTimeout as e:
+        # O sistema externo recebeu a mensagem e não respondeu a tempo: pode
+        # tê-la processado, então não é reenviada (evita entrega duplicada)
+        updates = {
+            "external_system_status": "failed",
+            "external_system_response": f"Read timeout: {str(e)[:500]}",
+            "forwarded_at": timezone.now(),
+        }
+        logger.error(f"Timeout waiting for the external system response: {e}")
+
+    except requests.exceptions.ConnectionError as e:
+        # Nenhuma URL aceitou a conexão (inclui ConnectTimeout): a mensagem
+        # não chegou ao destino e continua pendente para ser reenviada pelo
+        # comando retry_pending_messages
+        updates = {
+            "external_system_status": "pending",
+            "external_system_response": f"Network error: {str(e)[:500]}",
+        }
+        logger.error(f"Error forwarding data to external system: {e}")
+        if attempt < FORWARD_MAX_RETRIES:
+            retry_delay = FORWARD_RETRY_BACKOFF * 2**attempt
+
+    except requests.exceptions.RequestException as e:
+        # Erro que não se resolve com novo envio (ex.: URL inválida)
+        updates = {
+            "external_system_status": "failed",
+            "external_system_response": f"Request error: {str(e)[:500]}",
+            "forwarded_at": timezone.now(),
+        }
+        logger.error(f"Error forwarding data to external system: {e}")
+
+    # UPDATE condicional: só grava se a reserva ainda for deste envio, para
+    # não sobrescrever o resultado gravado pela expiração
+    updated = MessageLog.objects.filter(
+        pk=message_log_id, external_system_status="forwarding"
+    ).update(**updates)
+    if not updated:
+        logger.warning(
+            f"MessageLog {message_log_id} já finalizado por outro processo; "
+            "resultado do encaminhamento descartado"
+        )
+    elif retry_delay is not None:
+        logger.info(
+            f"Reenvio de {message_id} agendado em {retry_delay}s "
+            f"(tentativa {attempt + 1}/{FORWARD_MAX_RETRIES})"
+        )
+        enqueue_later(retry_delay, forward_message, message_log_id, attempt + 1)
+
+
+def retry_pending_messages(max_age_minutes: int = 60, min_age_minutes: int = 1):
+    """
+    Reenvia as mensagens que ficaram pendentes por falha de rede.
+
+    Mensagens pendentes (ou presas em 'forwarding', ex.: worker encerrado
+    durante o envio) mais antigas que max_age_minutes são marcadas como
+    'failed'; as mais recentes que min_age_minutes são ignoradas. Um envio em
+    andamento nunca é repetido: forward_message só envia a mensagem que
+    conseguir reservar.
+
+    Returns:
+        tuple: (mensagens reenviadas, mensagens expiradas)
+    """
+    now = timezone.now()
+    max_age = now - timedelta(minutes=max_age_minutes)
+    min_age = now - timedelta(minutes=min_age_minutes)
+
+    expired = MessageLog.objects.filter(
+        external_system_status__in=("pending", "forwarding"), created_at__lt=max_age
+    ).update(
+        external_system_status="failed",
+        forwarded_at=now,
+    )
+    if expired:
+        logger.warning(f"{expired} mensagens pendentes expiradas marcadas como failed")
+
+    # Apenas as chaves são materializadas (a janela é curta) para não manter
+    # um cursor aberto durante as chamadas de rede. Leituras que percorram a
+    # tabela inteira (exportações, relatórios) devem usar
+    # .order_by("pk").iterator(chunk_size=2000) em vez de carregar tudo.
+    pending_ids = list(
+        MessageLog.objects.filter(
+            external_system_status="pending",
+            created_at__gte=max_age,
+            created_at__lt=min_age,
+        )
+        .order_by("created_at")
+        .values_list("pk", flat=True)
+    )
+    for message_log_id in pending_ids:
+        # Sem retentativas em processo: o próximo ciclo do cron tenta de novo
+        forward_message(message_log_id, attempt=FORWARD_MAX_RETRIES)
+
+    return len(pending_ids), expired
+
+
+def forward_delivery_statuses(log_ids: list, attempt: int = 0):
+    """
+    Encaminha para a rota interna os status de entrega já gravados (pendentes)
+    em DeliveryWebhookLog e registra o resultado de cada um.
+
+    Como em forward_message, cada registro é reservado (pending -> forwarding)
+    antes do envio. Em falha de conexão o status volta a pendente e é
+    reagendado com backoff exponencial até FORWARD_MAX_RETRIES vezes; depois
+    disso fica para o comando retry_pending_deliveries. Timeouts de leitura e
+    respostas de erro são gravados como forward_error, sem reenvio.
+    """
+    start_ns = time.perf_counter_ns()
+    processed_count = 0
+    failed_count = 0
+    retry_ids = []
+
+    for log_id in log_ids:
+        webhook_status = _forward_delivery_status(log_id)
+        if webhook_status == "success":
+            processed_count += 1
+        elif webhook_status == "pending":
+            retry_ids.append(log_id)
+        elif webhook_status is not None:
+            failed_count += 1
+
+    if retry_ids and attempt < FORWARD_MAX_RETRIES:
+        delay = FORWARD_RETRY_BACKOFF * 2**attempt
+        logger.info(
+            f"Reenvio de {len(retry_ids)} status de entrega agendado em {delay}s "
+            f"(tentativa {attempt + 1}/{FORWARD_MAX_RETRIES})"
+        )
+        enqueue_later(delay, forward_delivery_statuses, retry_ids, attempt + 1)
+
+    logger.info(
+        "Delivery webhook completed: %d/%d processed, %d failed, %d pending - Time: %dms",
+        processed_count,
+        len(log_ids),
+        failed_count,
+        len(retry_ids),
+        (time.perf_counter_ns() - start_ns) // 1_000_000,
+    )
+
+
+def _forward_delivery_status(log_id: int):
+    """
+    Reserva e encaminha um status de entrega. Retorna o webhook_status
+    gravado, ou None se o registro não estava pendente (já encaminhado ou em
+    encaminhamento por outro processo).
+    """
+    claimed = DeliveryWebhookLog.objects.filter(
+        pk=log_id, webhook_status="pending"
+    ).update(webhook_status="forwarding")
+    if not claimed:
+        return None
+
+    delivery_log = DeliveryWebhookLog.objects.only(
+        "message_id", "delivery_message"
+    ).get(pk=log_id)
+    message_key = delivery_log.message_id
+    delivery_status = delivery_log.delivery_message
+    start_ns = time.perf_counter_ns()
+
+    # Encaminhar para rota interna
+    forward_payload = {"id_mensagem": message_key, "retorno_envio": delivery_status}
+
+    try:
+        response = http_session.post(
+            INTERNAL_STATUS_URL,
+            json=forward_payload,
+            timeout=INTERNAL_FORWARD_TIMEOUT,
+            headers={"Content-Type": "application/json"},
+        )
+
+        # Processar resposta
+        if response.status_code == 404:
+            # ID não encontrado
+            webhook_status = "not_found"
+            logger.warning(f"Message ID not found in internal system: {message_key}")
+
+        elif 200 <= response.status_code < 400:
+            # Sucesso
+            webhook_status = "success"
+            logger.info(
+                "Delivery callback processed successfully: %s - Status: %s",
+                message_key,
+                delivery_status,
+            )
+
+        else:
+            # Erro HTTP
+            webhook_status = "forward_error"
+            logger.error(
+                f"Internal route returned error {response.status_code} for message {message_key}"
+            )
+
+        updates = {
+            "webhook_status": webhook_status,
+            "internal_route_status_code": response.status_code,
+            "internal_route_response": response.text[:500],
+        }
+
+    except requests.exceptions.ConnectionError as e:
+        # A rota interna não aceitou a conexão: o status não chegou ao destino
+        # e continua pendente para ser reenviado
+        updates = {
+            "webhook_status": "pending",
+            "internal_route_response": f"Network error: {str(e)[:500]}",
+        }
+        logger.error(f"Network error forwarding to internal system: {e}")
+
+    except requests.exceptions.RequestException as e:
+        # Timeout de leitura e demais erros: a rota interna pode ter recebido
+        # o status, então não é reenviado
+        updates = {
+            "webhook_status": "forward_error",
+            "internal_route_response": f"Network error: {str(e)[:500]}",
+        }
+        logger.error(f"Network error forwarding to internal system: {e}")
+
+    except Exception as e:
+        # Erro inesperado
+        updates = {
+            "webhook_status": "forward_error",
+            "internal_route_response": f"Unexpected error: {str(e)[:500]}",
+        }
+        logger.error(f"Unexpected error processing status for {message_key}: {e}")
+
+    updates["processing_time_ms"] = (time.perf_counter_ns() - start_ns) // 1_000_000
+
+    # UPDATE condicional: só grava se a reserva ainda for deste envio, para
+    # não sobrescrever o resultado gravado pela expiração
+    updated = DeliveryWebhookLog.objects.filter(
+        pk=log_id, webhook_status="forwarding"
+    ).update(**updates)
+    if not updated:
+        logger.warning(
+            f"DeliveryWebhookLog {log_id} já finalizado por outro processo; "
+            "resultado do encaminhamento descartado"
+        )
+        return None
+    return updates["webhook_status"]
+
+
+def retry_pending_deliveries(max_age_minutes: int = 60, min_age_minutes: int = 1):
+    """
+    Reenvia os status de entrega que ficaram pendentes por falha de conexão.
+
+    Status pendentes (ou presos em 'forwarding', ex.: worker encerrado durante
+    o envio) mais antigos que max_age_minutes são marcados como
+    'forward_error'; os mais recentes que min_age_minutes são ignorados.
+
+    Returns:
+        tuple: (status reenviados, status expirados)
+    """
+    now = timezone.now()
+    max_age = now - timedelta(minutes=max_age_minutes)
+    min_age = now - timedelta(minutes=min_age_minutes)
+
+    expired = DeliveryWebhookLog.objects.filter(
+        webhook_status__in=("pending", "forwarding"), created_at__lt=max_age
+    ).update(
+        webhook_status="forward_error",
+        internal_route_response="Expirado sem encaminhamento",
+    )
+    if expired:
+        logger.warning(
+            f"{expired} status de entrega pendentes expirados marcados como forward_error"
+        )
+
+    pending_ids = list(
+        DeliveryWebhookLog.objects.filter(
+            webhook_status="pending",
+            created_at__gte=max_age,
+            created_at__lt=min_age,
+        )
+        .order_by("created_at")
+        .values_list("pk", flat=True)
+    )
+    if pending_ids:
+        # Sem retentativas em processo: o próximo ciclo do cron tenta de novo
+        forward_delivery_statuses(pending_ids, attempt=FORWARD_MAX_RETRIES)
+
+    return len(pending_ids), expired
+
+
+def _delete_older_than(model, cutoff_date, batch_size: int) -> int:
+    """
+    Remove registros de model criados antes de cutoff_date em lotes de até
+    batch_size, cada um em sua própria transação curta, para não manter locks
+    longos na tabela. Se interrompido, os lotes já removidos permanecem.
+
+    Usa _raw_delete (um DELETE direto, sem o collector nem sinais do Django):
+    os modelos de log não têm registros dependentes nem sinais de exclusão.
+    """
+    queryset = model.objects.filter(created_at__lt=cutoff_date)
+    deleted_total = 0
+    while True:
+        ids = list(queryset.values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            break
+        batch = model.objects.filter(pk__in=ids)
+        with transaction.atomic(using=batch.db):
+            deleted_total += batch._raw_delete(batch.db)
+    return deleted_total
+
+
+def cleanup_old_messages(batch_size: int = CLEANUP_BATCH_SIZE) -> int:
+    """
+    Remove mensagens mais antigas que MESSAGE_RETENTION_DAYS.
+
+    Returns:
+        int: Quantidade de mensagens removidas
+    """
+    retention_days = getattr(settings, "MESSAGE_RETENTION_DAYS", 5)
+    cutoff_date = timezone.now() - timedelta(days=retention_days)
+    deleted = _delete_older_than(MessageLog, cutoff_date, batch_size)
+    if deleted:
+        logger.info(
+            f"Limpeza: {deleted} mensagens antigas removidas (mais de {retention_days} dias)"
+        )
+    return deleted
+
+
+def cleanup_old_api_requests(batch_size: int = CLEANUP_BATCH_SIZE) -> int:
+    """
+    Remove logs de requisição da API mais antigos que API_REQUEST_LOG_RETENTION_DAYS.
+
+    Returns:
+        int: Quantidade de logs removidos
+    """
+    retention_days = getattr(settings, "API_REQUEST_LOG_RETENTION_DAYS", 7)
+    cutoff_date = timezone.now() - timedelta(days=retention_days)
+    deleted = _delete_older_than(ApiRequestLog, cutoff_date, batch_size)
+    if deleted:
+        logger.info(
+            f"Limpeza: {deleted} logs de API removidos (mais de {retention_days} dias)"
+        )
+    return deleted
+
+
+def cleanup_old_delivery_logs(batch_size: int = CLEANUP_BATCH_SIZE) -> int:
+    """
+    Remove logs de delivery mais antigos que DELIVERY_WEBHOOK_LOG_RETENTION_DAYS.
+
+    Returns:
+        int: Quantidade de logs removidos
+    """
+    retention_days = getattr(settings, "DELIVERY_WEBHOOK_LOG_RETENTION_DAYS", 7)
+    cutoff_date = timezone.now() - timedelta(days=retention_days)
+    deleted = _delete_older_than(DeliveryWebhookLog, cutoff_date, batch_size)
+    if deleted:
+        logger.info(
+            f"Limpeza: {deleted} logs de delivery removidos (mais de {retention_days} dias)"
+        )
+    return deleted
@@ -1,247 +1,171 @@
-import json
+import hmac
 import logging
-import re
 from typing import Optional
+
+import orjson
 from django_ratelimit.decorators import ratelimit
 import time
 from .models import ApiToken, ApiRequestLog, DeliveryWebhookLog
 
 from django.conf import settings
-from django.http import HttpRequest, JsonResponse, HttpResponse
+from django.http import HttpRequest, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.shortcuts import render
 from django.utils import timezone
+from django.utils.functional import cached_property
 from django.contrib.auth.decorators import login_required
-from datetime import timedelta
-from django.db import models
+from datetime import date, datetime, timedelta
+from functools import partial
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Substr
 
 from .models import MessageLog
 from django.core.paginator import Paginator
 from django.core.cache import cache
 import requests
 
+from . import logbatcher, tasks
+from .fallback import jittered_timeout, parse_urls, try_urls_with_cache
 
-logger = logging.getLogger(__name__)
 
+logger = logging.getLogger(__name__)
 
-def _cleanup_old_messages():
+# Tempo (segundos) que a busca de um token de API fica em cache. Alterações
+# feitas pelo admin invalidam a entrada (zapi_webhook/signals.py), mas com o
+# cache local (LocMem) só no processo que atendeu o admin
+API_TOKEN_CACHE_TIMEOUT = getattr(settings, "API_TOKEN_CACHE_TIMEOUT", 45)
+
+# Intervalo mínimo (segundos) entre gravações de ApiToken.last_used
+API_TOKEN_LAST_USED_INTERVAL = 60
+
+# Tokens esperados nas URLs dos webhooks (bytes, para comparação em tempo constante)
+ZAPI_WEBHOOK_URL_TOKEN = getattr(settings, "ZAPI_WEBHOOK_URL_TOKEN", "").encode()
+DELIVERY_WEBHOOK_TOKEN = getattr(settings, "DELIVERY_WEBHOOK_TOKEN", "").encode()
+
+# Tamanho máximo (bytes) do corpo aceito nos webhooks Z-API e de entrega
+ZAPI_MAX_BODY = getattr(settings, "ZAPI_MAX_BODY", 65536)
+DELIVERY_MAX_BODY = getattr(settings, "DELIVERY_MAX_BODY", 1048576)
+
+# Caracteres mantidos na sanitização do número da carga (apenas 0-9 ASCII)
+_ASCII_DIGITS = frozenset("0123456789")
+
+# Corpo fixo das respostas de sucesso do webhook Z-API e do healthz
+# (evita serializar a cada chamada)
+_OK_BODY = b'{"status": "ok"}'
+
+# URLs base da consulta de carga, processadas uma única vez
+CARGA_STATUS_URLS = tuple(
+    url.rstrip("/") for url in parse_urls(getattr(settings, "CARGA_STATUS_URL", ""))
+)
+CARGA_STATUS_TIMEOUT = getattr(settings, "CARGA_STATUS_TIMEOUT", 10)
+
+# Corpos das respostas de erro da API de consulta de carga, serializados uma
+# única vez
+_ERR_RATE_LIMITED = orjson.dumps(
+    {"error": "Rate limit excedido. Tente novamente em alguns instantes."}
+)
+_ERR_INVALID_TOKEN = orjson.dumps({"error": "Token inválido ou ausente"})
+_ERR_INVALID_CARGA = orjson.dumps(
+    {"error": "Número da carga inválido. Use apenas números."}
+)
+_ERR_NOT_CONFIGURED = orjson.dumps({"error": "Serviço de consulta não configurado"})
+_ERR_UPSTREAM_HTTP = orjson.dumps({"error": "Erro ao consultar sistema interno"})
+_ERR_TIMEOUT = orjson.dumps({"error": "Timeout na consulta ao sistema interno"})
+_ERR_CONNECTION = orjson.dumps({"error": "Erro de conexão com sistema interno"})
+_ERR_INTERNAL = orjson.dumps({"error": "Erro interno do sistema"})
+
+# Mensagem do sistema de carga quando o número não existe
+_CARGA_NOT_FOUND_MARKER = "Verificar o número da carga informado"
+_CARGA_NOT_FOUND_BYTES = b"da carga informado"
+
+# Tempo (segundos) que a resposta do sistema de carga fica em cache por número
+# de carga (0 desativa)
+CARGA_CACHE_TIMEOUT = getattr(settings, "CARGA_CACHE_TIMEOUT", 60)
+
+# Tempo (segundos) que uma falha na consulta de uma carga fica em cache, com o
+# status e o corpo devolvidos ao cliente (0 desativa)
+CARGA_ERROR_CACHE_TIMEOUT = getattr(settings, "CARGA_ERROR_CACHE_TIMEOUT", 10)
+
+# Chave do fallback da consulta pela API; também separa o cache da resposta
+# do usado pela página pública, que pede outro formato (Accept)
+_CARGA_API_FALLBACK_KEY = "carga_status_api"
+
+# Coalescência de consultas simultâneas à mesma carga: validade (segundos) da
+# trava e espera máxima de quem não a obteve (_CARGA_LOCK_POLLS verificações a
+# cada _CARGA_LOCK_POLL_INTERVAL segundos)
+_CARGA_LOCK_TIMEOUT = 5
+_CARGA_LOCK_POLLS = 10
+_CARGA_LOCK_POLL_INTERVAL = 0.05
+
+
+class OrjsonResponse(HttpResponse):
     """
-    Remove mensagens antigas baseado no parâmetro MESSAGE_RETENTION_DAYS.
-    Esta função é chamada automaticamente no dashboard para manter a base limpa.
+    Resposta JSON serializada com orjson (mais rápido que o json.dumps do
+    JsonResponse e já gera bytes).
     """
-    try:
-        retention_days = getattr(settings, "MESSAGE_RETENTION_DAYS", 5)
-        cutoff_date = timezone.now() - timedelta(days=retention_days)
-
-        # Contar quantos registros serão deletados
-        old_messages_count = MessageLog.objects.filter(
-            created_at__lt=cutoff_date
-        ).count()
-
-        if old_messages_count > 0:
-            # Deletar mensagens antigas
-            deleted_count, _ = MessageLog.objects.filter(
-                created_at__lt=cutoff_date
-            ).delete()
-            logger.info(
-                f"Limpeza automática: {deleted_count} mensagens antigas removidas (mais de {retention_days} dias)"
-            )
-            return deleted_count
-        else:
-            logger.debug(
-                f"Limpeza automática: nenhuma mensagem antiga encontrada (retenção: {retention_days} dias)"
-            )
-            return 0
 
-    except Exception as e:
-        logger.error(f"Erro durante limpeza automática de mensagens: {e}")
-        return 0
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(orjson.dumps(data), **kwargs)
 
 
-def _cleanup_old_api_requests():
+class _CountedPaginator(Paginator):
     """
-    Remove logs de requisição da API antigos.
+    Paginator que recebe o total já calculado (ex.: no aggregate das
+    estatísticas do dashboard) em vez de executar outro COUNT(*).
     """
-    try:
-        retention_days = getattr(settings, "API_REQUEST_LOG_RETENTION_DAYS", 7)
-        cutoff_date = timezone.now() - timedelta(days=retention_days)
-        deleted_count, _ = ApiRequestLog.objects.filter(
-            created_at__lt=cutoff_date
-        ).delete()
-        if deleted_count > 0:
-            logger.info(
-                f"Limpeza automática: {deleted_count} logs de API antigos removidos."
-            )
-    except Exception as e:
-        logger.error(f"Erro durante limpeza automática de logs da API: {e}")
 
+    def __init__(self, object_list, per_page, count: int, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self._known_count = count
 
-def _cleanup_old_delivery_logs():
+    @cached_property
+    def count(self):
+        return self._known_count
+
+
+def _parse_day_start(date_str: str) -> Optional[datetime]:
     """
-    Remove logs de delivery antigos baseado em DELIVERY_WEBHOOK_LOG_RETENTION_DAYS.
-    Chamada automaticamente no webhook de delivery.
-    Padrão idêntico ao _cleanup_old_messages().
+    Converte uma data YYYY-MM-DD no início do dia (00:00, fuso local).
+    Permite filtrar created_at por intervalo sem aplicar DATE() na coluna.
     """
     try:
-        retention_days = getattr(settings, "DELIVERY_WEBHOOK_LOG_RETENTION_DAYS", 7)
-        cutoff_date = timezone.now() - timedelta(days=retention_days)
-        deleted_count, _ = DeliveryWebhookLog.objects.filter(
-            created_at__lt=cutoff_date
-        ).delete()
-        if deleted_count > 0:
-            logger.info(
-                f"Limpeza automática: {deleted_count} logs de delivery removidos "
-                f"(mais de {retention_days} dias)"
-            )
-        return deleted_count
-    except Exception as e:
-        logger.error(f"Erro durante limpeza automática de logs de delivery: {e}")
-        return 0
+        day = date.fromisoformat(date_str)
+    except ValueError:
+        return None
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
 
 
-def try_urls_with_cache(
-    urls_string: str,
-    method: str = "GET",
-    timeout: int = 10,
-    cache_key: str = "default",
-    cache_timeout: int = 300,
-    **kwargs,
-) -> requests.Response:
+def _date_range_filters(start_date: str, end_date: str) -> dict:
     """
-    Tenta fazer requisição HTTP em múltiplas URLs com sistema de cache inteligente.
-
-    O sistema tenta primeiro a URL que funcionou anteriormente (cache), depois tenta
-    todas as URLs em ordem até encontrar uma que funcione.
-
-    Args:
-        urls_string: String com URLs separadas por vírgula (ex: "127.0.0.1:8003,192.168.1.100:8004")
-        method: Método HTTP (GET, POST, etc)
-        timeout: Timeout por tentativa em segundos
-        cache_key: Chave única para identificar este grupo de URLs no cache
-        cache_timeout: Tempo em segundos que a URL bem-sucedida fica em cache (padrão: 5min)
-        **kwargs: Argumentos adicionais para requests (json, headers, etc)
-
-    Returns:
-        requests.Response: Resposta da requisição bem-sucedida
-
-    Raises:
-        requests.exceptions.RequestException: Se todas as URLs falharem
+    Monta os filtros de created_at para o intervalo [início de start_date,
+    início do dia seguinte a end_date). Datas vazias ou inválidas são ignoradas.
     """
-    # Parsear URLs da string
-    urls = [url.strip() for url in urls_string.split(",") if url.strip()]
-
-    if not urls:
-        raise ValueError("Nenhuma URL válida fornecida")
-
-    # Adicionar http:// se não tiver protocolo
-    urls = [
-        url if url.startswith(("http://", "https://")) else f"http://{url}"
-        for url in urls
-    ]
-
-    # Tentar obter URL do cache
-    cache_full_key = f"url_fallback_{cache_key}"
-    cached_url = cache.get(cache_full_key)
-
-    # Lista de URLs para tentar (cache primeiro, depois as outras)
-    urls_to_try = []
-    if cached_url and cached_url in urls:
-        urls_to_try.append(cached_url)
-        # Adicionar as outras URLs (sem repetir a do cache)
-        urls_to_try.extend([url for url in urls if url != cached_url])
-        logger.debug(f"Fallback: Tentando primeiro URL do cache: {cached_url}")
-    else:
-        urls_to_try = urls
-        logger.debug("Fallback: Cache vazio ou inválido, tentando URLs em ordem")
-
-    last_exception = None
-    failed_urls = []
-
-    # Tentar cada URL
-    for i, url in enumerate(urls_to_try, 1):
-        try:
-            logger.info(f"Fallback: Tentativa {i}/{len(urls_to_try)} - URL: {url}")
-            start_time = time.time()
-
-            # Fazer requisição
-            response = requests.request(
-                method=method, url=url, timeout=timeout, **kwargs
-            )
-
-            elapsed_ms = int((time.time() - start_time) * 1000)
-
-            # Verificar se foi bem-sucedido (status 2xx ou 3xx)
-            if 200 <= response.status_code < 400:
-                logger.info(
-                    f"Fallback: ✓ Sucesso com URL {url} - "
-                    f"Status: {response.status_code} - Tempo: {elapsed_ms}ms"
-                )
-
-                # Salvar no cache
-                if url != cached_url:
-                    cache.set(cache_full_key, url, cache_timeout)
-                    logger.info(
-                        f"Fallback: URL {url} salva no cache por {cache_timeout}s"
-                    )
+    filters = {}
+    start_dt = _parse_day_start(start_date) if start_date else None
+    end_dt = _parse_day_start(end_date) if end_date else None
+    if start_dt:
+        filters["created_at__gte"] = start_dt
+    if end_dt:
+        filters["created_at__lt"] = end_dt + timedelta(days=1)
+    return filters
 
-                # Log de falhas anteriores (se houver)
-                if failed_urls:
-                    logger.warning(
-                        f"Fallback: URLs que falharam antes do sucesso: {', '.join(failed_urls)}"
-                    )
-
-                return response
-            else:
-                # Status de erro HTTP
-                failed_urls.append(url)
-                logger.warning(
-                    f"Fallback: ✗ URL {url} retornou status {response.status_code} - "
-                    f"Tempo: {elapsed_ms}ms"
-                )
-                last_exception = requests.exceptions.HTTPError(
-                    f"HTTP {response.status_code}", response=response
-                )
-
-        except requests.exceptions.Timeout:
-            failed_urls.append(url)
-            elapsed_ms = int((time.time() - start_time) * 1000)
-            logger.warning(f"Fallback: ✗ Timeout na URL {url} após {elapsed_ms}ms")
-            last_exception = requests.exceptions.Timeout(f"Timeout ao acessar {url}")
 
-        except requests.exceptions.ConnectionError as e:
-            failed_urls.append(url)
-            logger.warning(f"Fallback: ✗ Erro de conexão na URL {url}: {str(e)[:100]}")
-            last_exception = e
-
-        except requests.exceptions.RequestException as e:
-            failed_urls.append(url)
-            logger.warning(f"Fallback: ✗ Erro na URL {url}: {str(e)[:100]}")
-            last_exception = e
-
-    # Se chegou aqui, todas as URLs falharam
-    logger.error(
-        f"Fallback: ✗✗✗ TODAS as {len(urls_to_try)} URLs falharam! "
-        f"URLs tentadas: {', '.join(failed_urls)}"
-    )
-
-    # Limpar cache se todas falharam
-    if cached_url:
-        cache.delete(cache_full_key)
-        logger.info("Fallback: Cache limpo devido a falhas consecutivas")
-
-    # Levantar a última exceção
-    if last_exception:
-        raise last_exception
-    else:
-        raise requests.exceptions.RequestException(
-            f"Todas as URLs falharam: {', '.join(failed_urls)}"
-        )
+def _content_length(request: HttpRequest) -> int:
+    """
+    Tamanho do corpo declarado no header Content-Length (0 se ausente ou inválido).
+    """
+    try:
+        return int(request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        return 0
 
 
 def _url_token_is_valid(url_token: str) -> bool:
-    expected = getattr(settings, "ZAPI_WEBHOOK_URL_TOKEN", "")
-    return bool(expected) and url_token == expected
+    return bool(ZAPI_WEBHOOK_URL_TOKEN) and hmac.compare_digest(
+        url_token.encode(), ZAPI_WEBHOOK_URL_TOKEN
+    )
 
 
 def _delivery_token_is_valid(url_token: str) -> bool:
@@ -249,34 +173,47 @@ def _delivery_token_is_valid(url_token: str) -> bool:
     Valida token do webhook de delivery.
     Padrão idêntico ao _url_token_is_valid() existente.
     """
-    expected = getattr(settings, "DELIVERY_WEBHOOK_TOKEN", "")
-    return bool(expected) and url_token == expected
+    return bool(DELIVERY_WEBHOOK_TOKEN) and hmac.compare_digest(
+        url_token.encode(), DELIVERY_WEBHOOK_TOKEN
+    )
 
 
 @csrf_exempt
 @require_http_methods(["POST"])
 # @ratelimit(key='ip', rate='100/m', method='POST', block=True)  # Temporariamente desabilitado
 def zapi_on_message_received(request: HttpRequest, url_token: str) -> HttpResponse:
-    # Executar limpeza automática de mensagens antigas
-    _cleanup_old_messages()
-
     # Verificar se o token é válido
     if not _url_token_is_valid(url_token):
         logger.warning("Invalid URL token for Z-API webhook")
-        return JsonResponse({"detail": "Invalid token"}, status=401)
+        return OrjsonResponse({"detail": "Invalid token"}, status=401)
 
-    content_type = request.headers.get("Content-Type", "")
-    if "application/json" not in content_type:
-        return JsonResponse({"detail": "Unsupported Media Type"}, status=415)
+    if request.content_type != "application/json":
+        return OrjsonResponse({"detail": "Unsupported Media Type"}, status=415)
+
+    # Recusar corpos grandes antes de lê-los para a memória
+    content_length = _content_length(request)
+    if content_length > ZAPI_MAX_BODY:
+        logger.warning(f"Payload do webhook Z-API muito grande: {content_length} bytes")
+        return OrjsonResponse({"detail": "Payload too large"}, status=413)
+
+    body_bytes = request.body
+    if not body_bytes:
+        return OrjsonResponse({"detail": "Invalid JSON"}, status=400)
+
+    # Eventos sem bloco "text" (status, digitando, etc.) são ignorados sem
+    # parsear o JSON
+    if b'"text"' not in body_bytes:
+        return HttpResponse(_OK_BODY, content_type="application/json")
 
     try:
-        body_bytes = request.body or b""
-        payload = json.loads(body_bytes.decode("utf-8") or "{}")
-    except json.JSONDecodeError:
-        return JsonResponse({"detail": "Invalid JSON"}, status=400)
+        payload = orjson.loads(body_bytes)
+    except orjson.JSONDecodeError:
+        return OrjsonResponse({"detail": "Invalid JSON"}, status=400)
+    if not isinstance(payload, dict):
+        return OrjsonResponse({"detail": "Invalid JSON"}, status=400)
 
     # Log only text messages; ignore other message kinds
-    text_block = payload.get("text") if isinstance(payload, dict) else None
+    text_block = payload.get("text")
     if isinstance(text_block, dict) and "message" in text_block:
         is_group = payload.get("isGroup", False)
         message_id = payload.get("messageId", "")
@@ -284,86 +221,42 @@ def zapi_on_message_received(request: HttpRequest, url_token: str) -> HttpRespon
         message = text_block.get("message", "")
         broadcast = text_block.get("broadcast", False)
 
-        # Save to database
+        # Save to database; forwarding runs in background after commit
         try:
-            message_log = MessageLog.objects.create(
-                is_group=is_group,
-                message_id=message_id,
-                phone=phone,
-                message=message,
-                broadcast=broadcast,
-                external_system_status="pending",
-            )
-            logger.info(f"Message saved to database: {message_id}")
+            with transaction.atomic():
+                message_log = MessageLog.objects.create(
+                    is_group=is_group,
+                    message_id=message_id,
+                    phone=phone,
+                    message=message,
+                    broadcast=broadcast,
+                    external_system_status="pending",
+                )
+                transaction.on_commit(
+                    partial(tasks.enqueue, tasks.forward_message, message_log.pk)
+                )
+            logger.info("Message saved to database: %s", message_id)
+        except IntegrityError:
+            # Mensagem já recebida (reentrega do Z-API): não encaminhar de novo
+            logger.info("Duplicate message ignored: %s", message_id)
+            return HttpResponse(_OK_BODY, content_type="application/json")
         except Exception as e:
             logger.error(f"Error saving message to database: {e}")
-            return JsonResponse({"detail": "Database error"}, status=500)
+            return OrjsonResponse({"detail": "Database error"}, status=500)
 
-        # Forward data to another system
-        try:
-            forward_data = {
-                "is_group": is_group,
-                "message_id": message_id,
-                "phone": phone,
-                "message": message,
-                "broadcast": broadcast,
-            }
-
-            # Usar sistema de fallback com múltiplas URLs
-            response = try_urls_with_cache(
-                urls_string=settings.EXTERNAL_SYSTEM_URL,
-                method="POST",
-                timeout=settings.EXTERNAL_SYSTEM_TIMEOUT,
-                cache_key="external_system",
-                cache_timeout=300,  # 5 minutos
-                json=forward_data,
+        # Detalhes da mensagem apenas em nível DEBUG (evita formatar a cada webhook)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                f"Z-API text received | isGroup={is_group} | messageId={message_id} | phone={phone} | message='{message}' | broadcast={broadcast}"
             )
 
-            # Update database with forwarding results
-            if response.status_code == 200:
-                message_log.external_system_status = "success"
-                message_log.external_system_response = response.text[
-                    :500
-                ]  # Limit response size
-                message_log.external_system_status_code = response.status_code
-                message_log.forwarded_at = timezone.now()
-                logger.info(
-                    f"Data forwarded successfully to external system: {message_id}"
-                )
-            else:
-                message_log.external_system_status = "failed"
-                message_log.external_system_response = (
-                    f"HTTP {response.status_code}: {response.text[:500]}"
-                )
-                message_log.external_system_status_code = response.status_code
-                message_log.forwarded_at = timezone.now()
-                logger.warning(
-                    f"Failed to forward data to external system. Status: {response.status_code}, Response: {response.text}"
-                )
-
-            # Save the updated record
-            message_log.save()
-
-        except requests.exceptions.RequestException as e:
-            # Update database with error information
-            message_log.external_system_status = "failed"
-            message_log.external_system_response = f"Network error: {str(e)[:500]}"
-            message_log.forwarded_at = timezone.now()
-            message_log.save()
-            logger.error(f"Error forwarding data to external system: {e}")
-
-        # Simple console logging
-        print(
-            f"Z-API text received | isGroup={is_group} | messageId={message_id} | phone={phone} | message='{message}' | broadcast={broadcast}"
-        )
-
     # Return success response
-    return JsonResponse({"status": "ok"}, status=200)
+    return HttpResponse(_OK_BODY, content_type="application/json")
 
 
 @require_http_methods(["GET"])
 def healthz(request: HttpRequest) -> HttpResponse:
-    return JsonResponse({"status": "ok"}, status=200)
+    return HttpResponse(_OK_BODY, content_type="application/json")
 
 
 @csrf_exempt
@@ -389,28 +282,34 @@ def delivery_webhook_callback(request: HttpRequest, url_token: str) -> HttpRespo
         ]
     }
 
-    Encaminha para rota interna via POST com {"id_mensagem": "message_key", "retorno_envio": "status"}
+    Encaminha para rota interna via POST com {"id_mensagem": "message_key", "retorno_envio": "status"}.
+    Cada status é gravado como pendente em DeliveryWebhookLog antes da
+    resposta; o encaminhamento roda em segundo plano após o commit.
     """
-    start_time = time.time()
-
-    # Executar limpeza automática
-    _cleanup_old_delivery_logs()
+    start_ns = time.perf_counter_ns()
 
     # 1. Validar token
     if not _delivery_token_is_valid(url_token):
         logger.warning("Invalid URL token for delivery webhook")
-        return JsonResponse({"detail": "Invalid token"}, status=401)
+        return OrjsonResponse({"detail": "Invalid token"}, status=401)
 
     # 2. Validar Content-Type
     content_type = request.META.get("CONTENT_TYPE", "")
     if "application/json" not in content_type:
-        return JsonResponse({"detail": "Unsupported Media Type"}, status=415)
+        return OrjsonResponse({"detail": "Unsupported Media Type"}, status=415)
+
+    # Recusar corpos grandes antes de lê-los para a memória
+    content_length = _content_length(request)
+    if content_length > DELIVERY_MAX_BODY:
+        logger.warning(
+            f"Payload do webhook de entrega muito grande: {content_length} bytes"
+        )
+        return OrjsonResponse({"detail": "Payload too large"}, status=413)
 
     # 3. Parsear JSON
     try:
-        body_bytes = request.body or b""
-        payload = json.loads(body_bytes.decode("utf-8") or "{}")
-    except json.JSONDecodeError:
+        payload = orjson.loads(request.body or b"{}")
+    except orjson.JSONDecodeError:
         # Registrar log de payload inválido
         try:
             ip_address = request.META.get("REMOTE_ADDR", "unknown")
@@ -421,11 +320,11 @@ def delivery_webhook_callback(request: HttpRequest, url_token: str) -> HttpRespo
                 ip_address=ip_address,
                 webhook_status="invalid_payload",
                 internal_route_response="Invalid JSON",
-                processing_time_ms=int((time.time() - start_time) * 1000),
+                processing_time_ms=(time.perf_counter_ns() - start_ns) // 1_000_000,
             )
         except Exception as e:
             logger.error(f"Erro ao registrar log de payload inválido: {e}")
-        return JsonResponse({"detail": "Invalid JSON"}, status=400)
+        return OrjsonResponse({"detail": "Invalid JSON"}, status=400)
 
     # 4. Extrair array de statuses
     statuses = payload.get("statuses", [])
@@ -441,157 +340,57 @@ def delivery_webhook_callback(request: HttpRequest, url_token: str) -> HttpRespo
                 ip_address=ip_address,
                 webhook_status="invalid_payload",
                 internal_route_response="Missing or invalid 'statuses' array",
-                processing_time_ms=int((time.time() - start_time) * 1000),
+                processing_time_ms=(time.perf_counter_ns() - start_ns) // 1_000_000,
             )
         except Exception as e:
             logger.error(f"Erro ao registrar log de estrutura inválida: {e}")
-        return JsonResponse(
+        return OrjsonResponse(
             {"detail": "Missing or invalid 'statuses' array"}, status=400
         )
 
-    # 5. Processar cada status recebido
+    # 5. Gravar cada status como pendente; o encaminhamento roda em segundo
+    # plano após o commit (e o cron retry_pending_deliveries retoma o que
+    # ficar pendente se o processo for encerrado antes)
     ip_address = request.META.get("REMOTE_ADDR", "unknown")
-    internal_system_url = getattr(
-        settings, "INTERNAL_SYSTEM_URL", "http://127.0.0.1:8000"
-    )
-    timeout = getattr(settings, "INTERNAL_FORWARD_TIMEOUT", 10)
-
-    processed_count = 0
-    failed_count = 0
-    results = []
-
+    logs = []
     for status_item in statuses:
-        # Extrair dados do status
-        message_data = status_item.get("message", {})
+        message_data = (
+            status_item.get("message", {}) if isinstance(status_item, dict) else None
+        )
+        if not isinstance(message_data, dict):
+            logger.warning("Status em formato inválido encontrado no payload")
+            continue
         message_key = message_data.get("message_key", "")
         delivery_status = message_data.get("status", "")
-
         if not message_key:
             logger.warning("Status sem message_key encontrado no payload")
-            failed_count += 1
             continue
-
         if not delivery_status:
             logger.warning(f"Status sem campo 'status' para message_key: {message_key}")
-            failed_count += 1
             continue
-
-        # Encaminhar para rota interna
-        internal_url = f"{internal_system_url}/atualizaretornomensagemporid/"
-        forward_payload = {"id_mensagem": message_key, "retorno_envio": delivery_status}
-
-        try:
-            response = requests.post(
-                internal_url,
-                json=forward_payload,
-                timeout=timeout,
-                headers={"Content-Type": "application/json"},
-            )
-
-            # Processar resposta
-            if response.status_code == 404:
-                # ID não encontrado
-                DeliveryWebhookLog.objects.create(
-                    message_id=message_key,
-                    delivery_message=delivery_status,
-                    raw_payload=payload,
-                    ip_address=ip_address,
-                    webhook_status="not_found",
-                    internal_route_status_code=404,
-                    internal_route_response=response.text[:500],
-                    processing_time_ms=int((time.time() - start_time) * 1000),
-                )
-                logger.warning(
-                    f"Message ID not found in internal system: {message_key}"
-                )
-                results.append({"message_key": message_key, "status": "not_found"})
-                failed_count += 1
-
-            elif 200 <= response.status_code < 400:
-                # Sucesso
-                DeliveryWebhookLog.objects.create(
-                    message_id=message_key,
-                    delivery_message=delivery_status,
-                    raw_payload=payload,
-                    ip_address=ip_address,
-                    webhook_status="success",
-                    internal_route_status_code=response.status_code,
-                    internal_route_response=response.text[:500],
-                    processing_time_ms=int((time.time() - start_time) * 1000),
-                )
-                logger.info(
-                    f"Delivery callback processed successfully: {message_key} - Status: {delivery_status}"
-                )
-                results.append({"message_key": message_key, "status": "ok"})
-                processed_count += 1
-
-            else:
-                # Erro HTTP
-                DeliveryWebhookLog.objects.create(
-                    message_id=message_key,
-                    delivery_message=delivery_status,
-                    raw_payload=payload,
-                    ip_address=ip_address,
-                    webhook_status="forward_error",
-                    internal_route_status_code=response.status_code,
-                    internal_route_response=response.text[:500],
-                    processing_time_ms=int((time.time() - start_time) * 1000),
-                )
-                logger.error(
-                    f"Internal route returned error {response.status_code} for message {message_key}"
-                )
-                results.append({"message_key": message_key, "status": "forward_error"})
-                failed_count += 1
-
-        except requests.exceptions.RequestException as e:
-            # Erro de rede/timeout
-            DeliveryWebhookLog.objects.create(
+        logs.append(
+            DeliveryWebhookLog(
                 message_id=message_key,
                 delivery_message=delivery_status,
                 raw_payload=payload,
                 ip_address=ip_address,
-                webhook_status="forward_error",
-                internal_route_response=f"Network error: {str(e)[:500]}",
-                processing_time_ms=int((time.time() - start_time) * 1000),
+                webhook_status="pending",
             )
-            logger.error(f"Network error forwarding to internal system: {e}")
-            results.append({"message_key": message_key, "status": "network_error"})
-            failed_count += 1
+        )
 
-        except Exception as e:
-            # Erro inesperado
-            logger.error(f"Unexpected error processing status for {message_key}: {e}")
-            try:
-                DeliveryWebhookLog.objects.create(
-                    message_id=message_key,
-                    delivery_message=delivery_status,
-                    raw_payload=payload,
-                    ip_address=ip_address,
-                    webhook_status="forward_error",
-                    internal_route_response=f"Unexpected error: {str(e)[:500]}",
-                    processing_time_ms=int((time.time() - start_time) * 1000),
+    try:
+        with transaction.atomic():
+            created = DeliveryWebhookLog.objects.bulk_create(logs, batch_size=500)
+            log_ids = [log.pk for log in created]
+            if log_ids:
+                transaction.on_commit(
+                    partial(tasks.enqueue, tasks.forward_delivery_statuses, log_ids)
                 )
-            except Exception:
-                pass
-            results.append({"message_key": message_key, "status": "error"})
-            failed_count += 1
-
-    # 6. Retornar resposta final
-    total_statuses = len(statuses)
-    response_data = {
-        "status": "ok",
-        "processed": processed_count,
-        "failed": failed_count,
-        "total": total_statuses,
-        "results": results,
-    }
-
-    logger.info(
-        f"Delivery webhook completed: {processed_count}/{total_statuses} processed, "
-        f"{failed_count} failed - Time: {int((time.time() - start_time) * 1000)}ms"
-    )
+    except Exception as e:
+        logger.error(f"Erro ao gravar status de entrega: {e}")
+        return OrjsonResponse({"detail": "Database error"}, status=500)
 
-    return JsonResponse(response_data, status=200)
+    return OrjsonResponse({"status": "ok", "total": len(statuses)}, status=200)
 
 
 @login_required
@@ -599,6 +398,9 @@ def dashboard(request):
     # Determinar qual aba está ativa
     active_tab = request.GET.get("tab", "api")  # "api" ou "messages"
 
+    # Data de hoje (fuso local), usada como filtro padrão em todas as abas
+    today_iso = timezone.localdate().isoformat()
+
     if active_tab == "messages":
         # Lógica existente para MessageLog
         phone = request.GET.get("phone", "")
@@ -609,9 +411,8 @@ def dashboard(request):
         end_date_str = request.GET.get("end_date")
         message_id = request.GET.get("message_id", "")
 
-        messages = MessageLog.objects.all()
-
-        # Filtro padrão: apenas se nenhum outro filtro for fornecido
+        # Filtro padrão (apenas se nenhum outro filtro for fornecido): o dia de
+        # hoje, aplicado abaixo como intervalo [00:00 de hoje, 00:00 de amanhã)
         if not any(
             [
                 phone,
@@ -623,54 +424,63 @@ def dashboard(request):
                 message_id,
             ]
         ):
-            today = timezone.now().date()
-            messages = messages.filter(created_at__date=today)
-            start_date = today.strftime("%Y-%m-%d")
-            end_date = today.strftime("%Y-%m-%d")
+            start_date = today_iso
+            end_date = today_iso
         else:
             start_date = start_date_str or ""
             end_date = end_date_str or ""
 
+        # Filtros montados em um dict e aplicados com um único .filter()
+        filters = _date_range_filters(start_date, end_date)
         if message_id:
-            messages = messages.filter(message_id=message_id)
+            filters["message_id"] = message_id
         if phone:
-            messages = messages.filter(phone__icontains=phone)
+            # Busca por prefixo (LIKE 'x%'), atendida pelo índice de phone
+            filters["phone__startswith"] = phone
         if status:
-            messages = messages.filter(external_system_status=status)
-        if start_date:
-            messages = messages.filter(created_at__date__gte=start_date)
-        if end_date:
-            messages = messages.filter(created_at__date__lte=end_date)
+            filters["external_system_status"] = status
         if is_group != "":
-            messages = messages.filter(is_group=(is_group == "true"))
+            filters["is_group"] = is_group == "true"
         if broadcast != "":
-            messages = messages.filter(broadcast=(broadcast == "true"))
-
-        # Estatísticas MessageLog (baseadas nos filtros)
-        total_messages = messages.count()
-        unique_contacts = messages.values("phone").distinct().count()
-        groups = messages.filter(is_group=True).count()
-        forwarded = messages.filter(external_system_status="forwarded").count()
-        failed = messages.filter(external_system_status="failed").count()
-        last_message = messages.order_by("-created_at").first()
+            filters["broadcast"] = broadcast == "true"
+        messages = MessageLog.objects.filter(**filters)
+
+        # Estatísticas MessageLog (baseadas nos filtros) em uma única consulta
+        stats = messages.aggregate(
+            total_messages=models.Count("id"),
+            unique_contacts=models.Count("phone", distinct=True),
+            groups=models.Count("id", filter=models.Q(is_group=True)),
+            forwarded=models.Count(
+                "id", filter=models.Q(external_system_status="forwarded")
+            ),
+            failed=models.Count("id", filter=models.Q(external_system_status="failed")),
+            last_message=models.Max("created_at"),
+        )
         last_message_time = (
-            last_message.created_at.strftime("%d/%m/%Y %H:%M:%S")
-            if last_message
+            stats["last_message"].strftime("%d/%m/%Y %H:%M:%S")
+            if stats["last_message"]
             else "-"
         )
 
-        paginator = Paginator(messages.order_by("-created_at"), 20)
+        # A tabela mostra só o início da mensagem: buscar um trecho (51 caracteres,
+        # o suficiente para o truncatechars:50 do template) em vez do texto inteiro
+        page_messages = (
+            messages.order_by("-created_at")
+            .only("id", "created_at", "phone", "is_group", "external_system_status")
+            .annotate(message_preview=Substr("message", 1, 51))
+        )
+        paginator = _CountedPaginator(page_messages, 20, stats["total_messages"])
         page_number = request.GET.get("page")
         page_obj = paginator.get_page(page_number)
 
         context = {
             "active_tab": "messages",
             "stats": {
-                "total_messages": total_messages,
-                "unique_contacts": unique_contacts,
-                "groups": groups,
-                "forwarded": forwarded,
-                "failed": failed,
+                "total_messages": stats["total_messages"],
+                "unique_contacts": stats["unique_contacts"],
+                "groups": stats["groups"],
+                "forwarded": stats["forwarded"],
+                "failed": stats["failed"],
                 "last_message": last_message_time,
             },
             "message_id": message_id,
@@ -691,60 +501,66 @@ def dashboard(request):
         start_date_str = request.GET.get("start_date")
         end_date_str = request.GET.get("end_date")
 
-        delivery_logs = DeliveryWebhookLog.objects.all()
-
-        # Filtro padrão: apenas se nenhum outro filtro for fornecido
+        # Filtro padrão (apenas se nenhum outro filtro for fornecido): o dia de
+        # hoje, aplicado abaixo como intervalo [00:00 de hoje, 00:00 de amanhã)
         if not any([message_id, webhook_status, start_date_str, end_date_str]):
-            today = timezone.now().date()
-            delivery_logs = delivery_logs.filter(created_at__date=today)
-            start_date = today.strftime("%Y-%m-%d")
-            end_date = today.strftime("%Y-%m-%d")
+            start_date = today_iso
+            end_date = today_iso
         else:
             start_date = start_date_str or ""
             end_date = end_date_str or ""
 
+        filters = _date_range_filters(start_date, end_date)
         if message_id:
-            delivery_logs = delivery_logs.filter(message_id__icontains=message_id)
+            filters["message_id__icontains"] = message_id
         if webhook_status:
-            delivery_logs = delivery_logs.filter(webhook_status=webhook_status)
-        if start_date:
-            delivery_logs = delivery_logs.filter(created_at__date__gte=start_date)
-        if end_date:
-            delivery_logs = delivery_logs.filter(created_at__date__lte=end_date)
-
-        # Estatísticas Delivery (baseadas nos filtros)
-        total_callbacks = delivery_logs.count()
-        success_callbacks = delivery_logs.filter(webhook_status="success").count()
-        not_found_callbacks = delivery_logs.filter(webhook_status="not_found").count()
-        forward_error_callbacks = delivery_logs.filter(
-            webhook_status="forward_error"
-        ).count()
-        invalid_payload_callbacks = delivery_logs.filter(
-            webhook_status="invalid_payload"
-        ).count()
-        last_callback = delivery_logs.order_by("-created_at").first()
+            filters["webhook_status"] = webhook_status
+        delivery_logs = DeliveryWebhookLog.objects.filter(**filters)
+
+        # Estatísticas Delivery (baseadas nos filtros) em uma única consulta
+        stats = delivery_logs.aggregate(
+            total_callbacks=models.Count("id"),
+            success_callbacks=models.Count(
+                "id", filter=models.Q(webhook_status="success")
+            ),
+            not_found_callbacks=models.Count(
+                "id", filter=models.Q(webhook_status="not_found")
+            ),
+            forward_error_callbacks=models.Count(
+                "id", filter=models.Q(webhook_status="forward_error")
+            ),
+            invalid_payload_callbacks=models.Count(
+                "id", filter=models.Q(webhook_status="invalid_payload")
+            ),
+            # AVG ignora os registros sem tempo de processamento
+            avg_time=models.Avg("processing_time_ms"),
+            last_callback=models.Max("created_at"),
+        )
         last_callback_time = (
-            last_callback.created_at.strftime("%d/%m/%Y %H:%M:%S")
-            if last_callback
+            stats["last_callback"].strftime("%d/%m/%Y %H:%M:%S")
+            if stats["last_callback"]
             else "-"
         )
-        avg_time = delivery_logs.filter(processing_time_ms__isnull=False).aggregate(
-            models.Avg("processing_time_ms")
-        )["processing_time_ms__avg"]
+        avg_time = stats["avg_time"]
         avg_time_formatted = f"{int(avg_time)} ms" if avg_time else "-"
 
-        paginator = Paginator(delivery_logs.order_by("-created_at"), 20)
+        # O payload bruto (JSON) e a resposta da rota interna não aparecem na
+        # tabela: não trazê-los do banco
+        page_logs = delivery_logs.order_by("-created_at").defer(
+            "raw_payload", "internal_route_response"
+        )
+        paginator = _CountedPaginator(page_logs, 20, stats["total_callbacks"])
         page_number = request.GET.get("page")
         page_obj = paginator.get_page(page_number)
 
         context = {
             "active_tab": "delivery",
             "stats": {
-                "total_callbacks": total_callbacks,
-                "success_callbacks": success_callbacks,
-                "not_found_callbacks": not_found_callbacks,
-                "forward_error_callbacks": forward_error_callbacks,
-                "invalid_payload_callbacks": invalid_payload_callbacks,
+                "total_callbacks": stats["total_callbacks"],
+                "success_callbacks": stats["success_callbacks"],
+                "not_found_callbacks": stats["not_found_callbacks"],
+                "forward_error_callbacks": stats["forward_error_callbacks"],
+                "invalid_payload_callbacks": stats["invalid_payload_callbacks"],
                 "last_callback": last_callback_time,
                 "avg_time": avg_time_formatted,
             },
@@ -765,9 +581,8 @@ def dashboard(request):
         start_date_str = request.GET.get("start_date")
         end_date_str = request.GET.get("end_date")
 
-        api_logs = ApiRequestLog.objects.all()
-
-        # Filtro padrão: apenas se nenhum outro filtro for fornecido
+        # Filtro padrão (apenas se nenhum outro filtro for fornecido): o dia de
+        # hoje, aplicado abaixo como intervalo [00:00 de hoje, 00:00 de amanhã)
         if not any(
             [
                 carga_number,
@@ -778,56 +593,71 @@ def dashboard(request):
                 end_date_str,
             ]
         ):
-            today = timezone.now().date()
-            api_logs = api_logs.filter(created_at__date=today)
-            start_date = today.strftime("%Y-%m-%d")
-            end_date = today.strftime("%Y-%m-%d")
+            start_date = today_iso
+            end_date = today_iso
         else:
             start_date = start_date_str or ""
             end_date = end_date_str or ""
 
+        filters = _date_range_filters(start_date, end_date)
         if carga_number:
-            api_logs = api_logs.filter(carga_number__icontains=carga_number)
+            filters["carga_number__icontains"] = carga_number
         if request_status:
-            api_logs = api_logs.filter(request_status=request_status)
+            filters["request_status"] = request_status
         if response_status:
-            api_logs = api_logs.filter(response_status=response_status)
+            filters["response_status"] = response_status
         if token_id:
-            api_logs = api_logs.filter(api_token_id=token_id)
-        if start_date:
-            api_logs = api_logs.filter(created_at__date__gte=start_date)
-        if end_date:
-            api_logs = api_logs.filter(created_at__date__lte=end_date)
-
-        # Estatísticas API (baseadas nos filtros)
-        total_requests = api_logs.count()
-        success_requests = api_logs.filter(request_status="success").count()
-        failed_requests = api_logs.exclude(request_status="success").count()
-        unique_ips = api_logs.values("ip_address").distinct().count()
-        avg_time = api_logs.filter(processing_time_ms__isnull=False).aggregate(
-            models.Avg("processing_time_ms")
-        )["processing_time_ms__avg"]
-        last_request = api_logs.order_by("-created_at").first()
+            filters["api_token_id"] = token_id
+        api_logs = ApiRequestLog.objects.filter(**filters)
+
+        # Estatísticas API (baseadas nos filtros) em uma única consulta
+        stats = api_logs.aggregate(
+            total_requests=models.Count("id"),
+            success_requests=models.Count(
+                "id", filter=models.Q(request_status="success")
+            ),
+            unique_ips=models.Count("ip_address", distinct=True),
+            avg_time=models.Avg("processing_time_ms"),
+            last_request=models.Max("created_at"),
+        )
+        avg_time = stats["avg_time"]
         last_request_time = (
-            last_request.created_at.strftime("%d/%m/%Y %H:%M:%S")
-            if last_request
+            stats["last_request"].strftime("%d/%m/%Y %H:%M:%S")
+            if stats["last_request"]
             else "-"
         )
 
         # Tokens disponíveis para filtro
         available_tokens = ApiToken.objects.filter(is_active=True).order_by("name")
 
-        paginator = Paginator(api_logs.order_by("-created_at"), 20)
+        # Nome do token na mesma consulta (evita um SELECT por linha) e apenas
+        # as colunas exibidas na tabela
+        page_logs = (
+            api_logs.order_by("-created_at")
+            .select_related("api_token")
+            .only(
+                "id",
+                "created_at",
+                "ip_address",
+                "carga_number",
+                "request_status",
+                "response_message",
+                "processing_time_ms",
+                "api_token__name",
+            )
+        )
+        paginator = _CountedPaginator(page_logs, 20, stats["total_requests"])
         page_number = request.GET.get("page")
         page_obj = paginator.get_page(page_number)
 
         context = {
             "active_tab": "api",
             "stats": {
-                "total_requests": total_requests,
-                "success_requests": success_requests,
-                "failed_requests": failed_requests,
-                "unique_ips": unique_ips,
+                "total_requests": stats["total_requests"],
+                "success_requests": stats["success_requests"],
+                # Toda requisição que não é sucesso conta como falha
+                "failed_requests": stats["total_requests"] - stats["success_requests"],
+                "unique_ips": stats["unique_ips"],
                 "avg_time": round(avg_time, 2) if avg_time else 0,
                 "last_request": last_request_time,
             },
@@ -858,26 +688,214 @@ def _sanitize_carga_number(carga_number: str) -> str:
     if not carga_number:
         return ""
 
-    # Remove todos os caracteres que não sejam dígitos
-    sanitized = re.sub(r"[^\d]", "", str(carga_number))
+    # Caso comum: já vem só com dígitos ASCII e nada precisa ser removido
+    sanitized = str(carga_number)
+    if not (sanitized.isascii() and sanitized.isdigit()):
+        # Remove todos os caracteres que não sejam dígitos
+        sanitized = "".join(ch for ch in sanitized if ch in _ASCII_DIGITS)
 
     # Limita o tamanho para evitar ataques de buffer overflow
     return sanitized[:20] if sanitized else ""
 
 
-def _extract_content_from_response(response_text: str, content_type: str = "") -> str:
+def _carga_status_urls(sanitized_carga: str) -> tuple[str, ...]:
+    """
+    Monta as URLs de fallback da consulta, adicionando o número da carga
+    em cada URL base.
+    """
+    return tuple(f"{url}/{sanitized_carga}" for url in CARGA_STATUS_URLS)
+
+
+def _carga_cache_key(sanitized_carga: str, fallback_cache_key: str) -> str:
+    """
+    Chave do cache da resposta do sistema de carga. Inclui a chave do fallback
+    porque cada consulta envia um Accept diferente e o sistema externo pode
+    responder em outro formato.
+    """
+    return f"carga:{fallback_cache_key}:{sanitized_carga}"
+
+
+def _fetch_carga_status(
+    sanitized_carga: str,
+    fallback_cache_key: str,
+    headers: dict,
+    lookup_cache: bool = True,
+) -> tuple[int, bytes, str]:
+    """
+    Consulta o sistema de carga (com fallback entre as URLs) e retorna
+    (status_code, conteúdo, content-type).
+
+    Respostas 200 ficam em cache por CARGA_CACHE_TIMEOUT segundos, evitando
+    repetir a chamada externa para a mesma carga em sequência. Em consultas
+    simultâneas à mesma carga sem cache, apenas a primeira vai ao sistema
+    externo; as demais aguardam brevemente o resultado dela no cache.
+
+    lookup_cache=False pula a leitura inicial do cache, para quem já a fez
+    (ex.: com _get_cached_carga_state).
+    """
+    if not CARGA_CACHE_TIMEOUT:
+        return _request_carga_status(sanitized_carga, fallback_cache_key, headers)
+
+    cache_key = _carga_cache_key(sanitized_carga, fallback_cache_key)
+    if lookup_cache:
+        cached = _get_cached_carga(cache_key)
+        if cached is not None:
+            logger.debug("Consulta da carga %s atendida pelo cache", sanitized_carga)
+            return cached
+
+    # cache.add só grava (e retorna True) se a trava ainda não existir
+    lock_key = f"{cache_key}:lock"
+    try:
+        is_leader = cache.add(lock_key, True, _CARGA_LOCK_TIMEOUT)
+    except Exception as e:
+        logger.warning(f"Cache indisponível na consulta de carga: {e}")
+        is_leader = True
+
+    if not is_leader:
+        for _ in range(_CARGA_LOCK_POLLS):
+            time.sleep(_CARGA_LOCK_POLL_INTERVAL)
+            cached = _get_cached_carga(cache_key)
+            if cached is not None:
+                return cached
+        # A primeira consulta falhou ou demorou: consultar diretamente
+
+    try:
+        result = _request_carga_status(sanitized_carga, fallback_cache_key, headers)
+        if result[0] == 200:
+            try:
+                cache.set(cache_key, result, jittered_timeout(CARGA_CACHE_TIMEOUT))
+            except Exception as e:
+                logger.warning(f"Cache indisponível na consulta de carga: {e}")
+    finally:
+        if is_leader:
+            try:
+                cache.delete(lock_key)
+            except Exception as e:
+                logger.warning(f"Cache indisponível na consulta de carga: {e}")
+    return result
+
+
+def _get_cached_carga(cache_key: str) -> Optional[tuple]:
+    try:
+        return cache.get(cache_key)
+    except Exception as e:
+        logger.warning(f"Cache indisponível na consulta de carga: {e}")
+        return None
+
+
+def _get_cached_carga_state(
+    sanitized_carga: str,
+) -> tuple[
+    Optional[tuple[dict, str]],
+    Optional[tuple[int, bytes, str]],
+    Optional[tuple[int, bytes]],
+]:
+    """
+    Retorna, para a carga, a resposta já processada pela API, a resposta
+    original e a falha recente em cache (None quando não houver), lidas numa
+    única chamada ao cache (get_many).
+    """
+    keys = []
+    if CARGA_CACHE_TIMEOUT:
+        keys.append(f"carga_proc:{sanitized_carga}")
+        keys.append(_carga_cache_key(sanitized_carga, _CARGA_API_FALLBACK_KEY))
+    if CARGA_ERROR_CACHE_TIMEOUT:
+        keys.append(f"carga_err:{sanitized_carga}")
+    if not keys:
+        return None, None, None
+    try:
+        found = cache.get_many(keys)
+    except Exception as e:
+        logger.warning(f"Cache indisponível na consulta de carga: {e}")
+        return None, None, None
+    return (
+        found.get(f"carga_proc:{sanitized_carga}"),
+        found.get(_carga_cache_key(sanitized_carga, _CARGA_API_FALLBACK_KEY)),
+        found.get(f"carga_err:{sanitized_carga}"),
+    )
+
+
+def _cache_processed_carga(
+    sanitized_carga: str, processed_response: dict, internal_response: str
+):
+    """
+    Guarda a resposta já processada pela API (com o trecho usado no log), para
+    que as próximas consultas da carga dispensem o parse e o processamento.
+    """
+    if not CARGA_CACHE_TIMEOUT:
+        return
+    try:
+        cache.set(
+            f"carga_proc:{sanitized_carga}",
+            (processed_response, internal_response),
+            jittered_timeout(CARGA_CACHE_TIMEOUT),
+        )
+    except Exception as e:
+        logger.warning(f"Cache indisponível na consulta de carga: {e}")
+
+
+def _cache_carga_error(sanitized_carga: str, status: int, body: bytes):
+    """
+    Guarda a falha da consulta por CARGA_ERROR_CACHE_TIMEOUT segundos, para
+    que novas requisições da mesma carga não repitam a chamada externa
+    enquanto o sistema de carga estiver instável.
+    """
+    if not CARGA_ERROR_CACHE_TIMEOUT:
+        return
+    try:
+        cache.set(
+            f"carga_err:{sanitized_carga}",
+            (status, body),
+            jittered_timeout(CARGA_ERROR_CACHE_TIMEOUT),
+        )
+    except Exception as e:
+        logger.warning(f"Cache indisponível na consulta de carga: {e}")
+
+
+def _request_carga_status(
+    sanitized_carga: str, fallback_cache_key: str, headers: dict
+) -> tuple[int, bytes, str]:
+    response = try_urls_with_cache(
+        urls_string=_carga_status_urls(sanitized_carga),
+        method="GET",
+        timeout=CARGA_STATUS_TIMEOUT,
+        cache_key=fallback_cache_key,
+        cache_timeout=300,  # 5 minutos
+        headers=headers,
+    )
+    return (
+        response.status_code,
+        response.content,
+        response.headers.get("content-type", ""),
+    )
+
+
+def _extract_content_from_response(content: bytes, content_type: str = "") -> str:
     """
     Extrai a mensagem da chave 'msg' do JSON retornado pelo sistema externo.
     """
+    # Conteúdo declarado como não-JSON (ex.: página HTML de erro) só é
+    # parseado se parecer um objeto JSON, pois o sistema externo nem sempre
+    # informa o content-type correto
+    if (
+        content_type
+        and not content_type.startswith("application/json")
+        and not content.lstrip().startswith(b"{")
+    ):
+        logger.error(f"Resposta do sistema externo não é JSON: {content_type}")
+        return "Erro ao processar resposta do sistema externo"
+
     try:
-        json_data = json.loads(response_text)
-        return str(json_data.get("msg", "Resposta sem mensagem"))
-    except json.JSONDecodeError as e:
+        json_data = orjson.loads(content)
+    except orjson.JSONDecodeError as e:
         logger.error(f"Erro ao parsear JSON da resposta: {e}")
         return "Erro ao processar resposta do sistema externo"
+    if not isinstance(json_data, dict):
+        return "Resposta sem mensagem"
+    return str(json_data.get("msg", "Resposta sem mensagem"))
 
 
-def _process_carga_response(response_text: str) -> dict:
+def _process_carga_response(content: bytes, content_type: str = "") -> dict:
     """
     Processa a resposta do sistema interno e retorna formato padronizado.
 
@@ -886,10 +904,12 @@ def _process_carga_response(response_text: str) -> dict:
         {"status": "1", "message": "..."} - Quando carga encontrada
     """
     # Extrair mensagem usando função existente
-    message = _extract_content_from_response(response_text)
+    message = _extract_content_from_response(content, content_type)
 
-    # Verificar se é mensagem de erro (carga não encontrada)
-    if "Verificar o número da carga informado" in message:
+    # Verificar se é mensagem de erro (carga não encontrada). A checagem em
+    # bytes usa o trecho ASCII do marcador, que aparece igual mesmo quando o
+    # JSON escapa os acentos, e descarta a maioria das respostas de imediato
+    if _CARGA_NOT_FOUND_BYTES in content and _CARGA_NOT_FOUND_MARKER in message:
         return {"status": "0", "message": ""}
 
     # Retornar mensagem normal
@@ -924,8 +944,7 @@ def consulta_status_carga(request):
             return render(request, "consulta_status_carga.html", context)
 
         # Verificar se a URL está configurada
-        carga_status_url = getattr(settings, "CARGA_STATUS_URL", "")
-        if not carga_status_url:
+        if not CARGA_STATUS_URLS:
             context["error_message"] = (
                 "Serviço de consulta não configurado. Entre em contato com o administrador."
             )
@@ -933,48 +952,32 @@ def consulta_status_carga(request):
             return render(request, "consulta_status_carga.html", context)
 
         try:
-            # Construir URLs para fallback (adiciona o número da carga em cada URL)
-            base_urls = carga_status_url.rstrip("/")
-            # Se tiver múltiplas URLs, adicionar o número da carga em cada uma
-            urls_with_carga = ",".join(
-                [f"{url.rstrip('/')}/{sanitized_carga}" for url in base_urls.split(",")]
-            )
-            timeout = getattr(settings, "CARGA_STATUS_TIMEOUT", 10)
-
-            logger.info(f"Consultando status da carga {sanitized_carga}")
+            logger.info("Consultando status da carga %s", sanitized_carga)
 
             # Fazer a requisição com sistema de fallback
-            response = try_urls_with_cache(
-                urls_string=urls_with_carga,
-                method="GET",
-                timeout=timeout,
-                cache_key="carga_status",
-                cache_timeout=300,  # 5 minutos
+            status_code, content, content_type = _fetch_carga_status(
+                sanitized_carga,
+                "carga_status",
                 headers={
                     "User-Agent": "Tambasa-Webhook/1.0",
                     "Accept": "text/plain, text/html, */*",
                 },
             )
 
-            if response.status_code == 200:
+            if status_code == 200:
                 # Extrai o conteúdo relevante da resposta
-                content_type = response.headers.get("content-type", "")
-                clean_response = _extract_content_from_response(
-                    response.text, content_type
-                )
+                clean_response = _extract_content_from_response(content, content_type)
 
                 context["status_response"] = clean_response
                 context["success"] = True
                 context["carga_number"] = sanitized_carga
                 logger.info(
-                    f"Consulta de carga {sanitized_carga} realizada com sucesso"
+                    "Consulta de carga %s realizada com sucesso", sanitized_carga
                 )
             else:
-                context["error_message"] = (
-                    f"Erro na consulta: HTTP {response.status_code}"
-                )
+                context["error_message"] = f"Erro na consulta: HTTP {status_code}"
                 logger.warning(
-                    f"Erro na consulta da carga {sanitized_carga}: HTTP {response.status_code}"
+                    f"Erro na consulta da carga {sanitized_carga}: HTTP {status_code}"
                 )
 
         except requests.exceptions.Timeout:
@@ -1016,6 +1019,38 @@ def _get_client_ip(request: HttpRequest) -> str:
     return ip
 
 
+def _get_active_api_token(token_value: str) -> Optional[ApiToken]:
+    """
+    Busca o token ativo correspondente, com cache para evitar uma consulta ao
+    banco a cada requisição. Tokens inexistentes ou revogados também ficam em
+    cache. Se o cache estiver indisponível, consulta direto o banco.
+    """
+    token_hash = ApiToken.hash_token(token_value)
+    cache_key = ApiToken.cache_key(token_hash)
+
+    try:
+        cached = cache.get(cache_key)
+    except Exception as e:
+        logger.warning(f"Cache indisponível na validação de token: {e}")
+        cached = None
+
+    if cached is None:
+        token = (
+            ApiToken.objects.filter(token_hash=token_hash, is_active=True)
+            .only("id", "name")
+            .first()
+        )
+        cached = {"id": token.pk, "name": token.name} if token else {}
+        try:
+            cache.set(cache_key, cached, API_TOKEN_CACHE_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Cache indisponível na validação de token: {e}")
+
+    if not cached:
+        return None
+    return ApiToken(id=cached["id"], name=cached["name"])
+
+
 def _validate_api_token(request: HttpRequest) -> tuple[bool, Optional[ApiToken]]:
     """
     Valida o token de autenticação do header Authorization.
@@ -1023,30 +1058,59 @@ def _validate_api_token(request: HttpRequest) -> tuple[bool, Optional[ApiToken]]
     Returns:
         (is_valid, token_obj)
     """
-    auth_header = request.headers.get("Authorization", "")
+    # Leitura direta do META, sem montar o dict de request.headers
+    auth_header = request.META.get("HTTP_AUTHORIZATION", "")
 
     if not auth_header.startswith("Bearer "):
         return False, None
 
-    token_value = auth_header.replace("Bearer ", "").strip()
+    token_value = auth_header[len("Bearer ") :].strip()
 
     if not token_value:
         return False, None
 
-    try:
-        token = ApiToken.objects.get(token=token_value, is_active=True)
-        # Atualizar último uso
-        token.last_used = timezone.now()
-        token.save(update_fields=["last_used"])
-        return True, token
-    except ApiToken.DoesNotExist:
+    token = _get_active_api_token(token_value)
+    if token is None:
         return False, None
 
+    # Atualizar último uso no máximo uma vez por intervalo: cache.add só
+    # grava (e retorna True) se a chave ainda não existir
+    try:
+        should_update = cache.add(
+            f"apitoken:last_used:{token.pk}", True, API_TOKEN_LAST_USED_INTERVAL
+        )
+    except Exception as e:
+        logger.warning(f"Cache indisponível na validação de token: {e}")
+        should_update = True
+    if should_update:
+        ApiToken.objects.filter(pk=token.pk).update(last_used=timezone.now())
+    return True, token
+
+
+def _log_api_request(
+    request_status: str, ip_address: str, carga_number: str, start_ns: int, **fields
+) -> int:
+    """
+    Agenda a gravação (em lote) do ApiRequestLog de uma requisição da API,
+    com o tempo decorrido desde start_ns. Retorna esse tempo, em ms.
+    """
+    processing_time = (time.perf_counter_ns() - start_ns) // 1_000_000
+    logbatcher.enqueue(
+        ApiRequestLog(
+            ip_address=ip_address,
+            carga_number=carga_number,
+            request_status=request_status,
+            processing_time_ms=processing_time,
+            **fields,
+        )
+    )
+    return processing_time
+
 
 @csrf_exempt
 @require_http_methods(["GET"])
 @ratelimit(key="header:authorization", rate="60/m", method="GET", block=False)
-def api_consulta_carga(request: HttpRequest, carga_number: str) -> JsonResponse:
+def api_consulta_carga(request: HttpRequest, carga_number: str) -> HttpResponse:
     """
     API endpoint para consulta de status de carga.
 
@@ -1060,168 +1124,176 @@ def api_consulta_carga(request: HttpRequest, carga_number: str) -> JsonResponse:
         429: {"error": "Rate limit excedido"}
         503: {"error": "Serviço indisponível"}
     """
-    _cleanup_old_api_requests()  # Limpeza de logs antigos
-    start_time = time.time()
+    start_ns = time.perf_counter_ns()
     ip_address = _get_client_ip(request)
 
     # Verificar rate limit
     if getattr(request, "limited", False):
         logger.warning(f"Rate limit excedido para IP {ip_address}")
-        ApiRequestLog.objects.create(
-            ip_address=ip_address,
-            carga_number=carga_number[:20],
-            request_status="rate_limited",
-            processing_time_ms=int((time.time() - start_time) * 1000),
-        )
-        return JsonResponse(
-            {"error": "Rate limit excedido. Tente novamente em alguns instantes."},
-            status=429,
+        _log_api_request("rate_limited", ip_address, carga_number[:20], start_ns)
+        return HttpResponse(
+            _ERR_RATE_LIMITED, status=429, content_type="application/json"
         )
 
     # Validar token
     is_valid, token_obj = _validate_api_token(request)
     if not is_valid:
         logger.warning(f"Tentativa de acesso com token inválido - IP: {ip_address}")
-        ApiRequestLog.objects.create(
-            ip_address=ip_address,
-            carga_number=carga_number[:20],
-            request_status="invalid_token",
-            processing_time_ms=int((time.time() - start_time) * 1000),
+        _log_api_request("invalid_token", ip_address, carga_number[:20], start_ns)
+        return HttpResponse(
+            _ERR_INVALID_TOKEN, status=401, content_type="application/json"
         )
-        return JsonResponse({"error": "Token inválido ou ausente"}, status=401)
 
     # Sanitizar número da carga
     sanitized_carga = _sanitize_carga_number(carga_number)
 
     if not sanitized_carga:
         logger.warning(f"Número de carga inválido: {carga_number} - IP: {ip_address}")
-        ApiRequestLog.objects.create(
-            ip_address=ip_address,
+        _log_api_request(
+            "invalid_input",
+            ip_address,
+            carga_number[:20],
+            start_ns,
             api_token=token_obj,
-            carga_number=carga_number[:20],
-            request_status="invalid_input",
-            processing_time_ms=int((time.time() - start_time) * 1000),
         )
-        return JsonResponse(
-            {"error": "Número da carga inválido. Use apenas números."}, status=400
+        return HttpResponse(
+            _ERR_INVALID_CARGA, status=400, content_type="application/json"
         )
 
     # Verificar se URL está configurada
-    carga_status_url = getattr(settings, "CARGA_STATUS_URL", "")
-    if not carga_status_url:
+    if not CARGA_STATUS_URLS:
         logger.error("CARGA_STATUS_URL não configurada")
-        ApiRequestLog.objects.create(
-            ip_address=ip_address,
-            api_token=token_obj,
-            carga_number=sanitized_carga,
-            request_status="system_error",
-            processing_time_ms=int((time.time() - start_time) * 1000),
+        _log_api_request(
+            "system_error", ip_address, sanitized_carga, start_ns, api_token=token_obj
         )
-        return JsonResponse(
-            {"error": "Serviço de consulta não configurado"}, status=503
+        return HttpResponse(
+            _ERR_NOT_CONFIGURED, status=503, content_type="application/json"
         )
 
-    try:
-        # Construir URLs para fallback (adiciona o número da carga em cada URL)
-        base_urls = carga_status_url.rstrip("/")
-        # Se tiver múltiplas URLs, adicionar o número da carga em cada uma
-        urls_with_carga = ",".join(
-            [f"{url.rstrip('/')}/{sanitized_carga}" for url in base_urls.split(",")]
+    # Falha recente da mesma carga: responder o mesmo erro sem consultar de novo
+    cached_processed, cached_response, cached_error = _get_cached_carga_state(
+        sanitized_carga
+    )
+    if cached_processed is None and cached_response is None and cached_error:
+        error_status, error_body = cached_error
+        logger.info("API: Erro em cache - Carga: %s", sanitized_carga)
+        _log_api_request(
+            "cached_error", ip_address, sanitized_carga, start_ns, api_token=token_obj
         )
-        timeout = getattr(settings, "CARGA_STATUS_TIMEOUT", 10)
-
-        logger.info(
-            f"API: Consultando carga {sanitized_carga} - Token: {token_obj.name} - IP: {ip_address}"
+        return HttpResponse(
+            error_body, status=error_status, content_type="application/json"
         )
 
-        # Fazer requisição com sistema de fallback
-        response = try_urls_with_cache(
-            urls_string=urls_with_carga,
-            method="GET",
-            timeout=timeout,
-            cache_key="carga_status_api",
-            cache_timeout=300,  # 5 minutos
-            headers={
-                "User-Agent": "Webhook-API/1.0",
-                "Accept": "application/json, text/plain, */*",
-            },
+    try:
+        logger.info(
+            "API: Consultando carga %s - Token: %s - IP: %s",
+            sanitized_carga,
+            token_obj.name,
+            ip_address,
         )
 
-        if response.status_code == 200:
-            # Processar resposta
-            processed_response = _process_carga_response(response.text)
+        if cached_processed is not None:
+            # Resposta já processada em cache: dispensa parse e processamento
+            logger.debug("Consulta da carga %s atendida pelo cache", sanitized_carga)
+            status_code = 200
+            processed_response, internal_response = cached_processed
+        else:
+            if cached_response is not None:
+                logger.debug(
+                    "Consulta da carga %s atendida pelo cache", sanitized_carga
+                )
+                status_code, content, content_type = cached_response
+            else:
+                # Fazer requisição com sistema de fallback
+                status_code, content, content_type = _fetch_carga_status(
+                    sanitized_carga,
+                    _CARGA_API_FALLBACK_KEY,
+                    headers={
+                        "User-Agent": "Webhook-API/1.0",
+                        "Accept": "application/json, text/plain, */*",
+                    },
+                    lookup_cache=False,
+                )
+            # Trecho da resposta para o log: corta os bytes antes de
+            # decodificar, sem converter o corpo inteiro em str
+            internal_response = content[:500].decode("utf-8", errors="replace")
+
+            if status_code == 200:
+                # Processar resposta
+                processed_response = _process_carga_response(content, content_type)
+                _cache_processed_carga(
+                    sanitized_carga, processed_response, internal_response
+                )
 
+        if status_code == 200:
             # Registrar log de sucesso
-            processing_time = int((time.time() - start_time) * 1000)
-            ApiRequestLog.objects.create(
-                ip_address=ip_address,
+            processing_time = _log_api_request(
+                "success",
+                ip_address,
+                sanitized_carga,
+                start_ns,
                 api_token=token_obj,
-                carga_number=sanitized_carga,
-                request_status="success",
                 response_status=processed_response["status"],
                 response_message=processed_response["message"],
-                internal_system_status_code=response.status_code,
-                internal_system_response=response.text[:500],
-                processing_time_ms=processing_time,
+                internal_system_status_code=status_code,
+                internal_system_response=internal_response,
             )
 
             logger.info(
-                f"API: Consulta bem-sucedida - Carga: {sanitized_carga} - "
-                f"Status: {processed_response['status']} - Tempo: {processing_time}ms"
+                "API: Consulta bem-sucedida - Carga: %s - Status: %s - Tempo: %dms",
+                sanitized_carga,
+                processed_response["status"],
+                processing_time,
             )
 
-            return JsonResponse(processed_response, status=200)
+            return OrjsonResponse(processed_response, status=200)
         else:
             # Erro HTTP do sistema interno
             logger.warning(
-                f"API: Erro HTTP {response.status_code} do sistema interno - Carga: {sanitized_carga}"
+                f"API: Erro HTTP {status_code} do sistema interno - Carga: {sanitized_carga}"
             )
-            ApiRequestLog.objects.create(
-                ip_address=ip_address,
+            _log_api_request(
+                "system_error",
+                ip_address,
+                sanitized_carga,
+                start_ns,
                 api_token=token_obj,
-                carga_number=sanitized_carga,
-                request_status="system_error",
-                internal_system_status_code=response.status_code,
-                internal_system_response=response.text[:500],
-                processing_time_ms=int((time.time() - start_time) * 1000),
+                internal_system_status_code=status_code,
+                internal_system_response=internal_response,
             )
-            return JsonResponse(
-                {"error": "Erro ao consultar sistema interno"}, status=503
+            _cache_carga_error(sanitized_carga, 503, _ERR_UPSTREAM_HTTP)
+            return HttpResponse(
+                _ERR_UPSTREAM_HTTP, status=503, content_type="application/json"
             )
 
     except requests.exceptions.Timeout:
         logger.error(f"API: Timeout na consulta - Carga: {sanitized_carga}")
-        ApiRequestLog.objects.create(
-            ip_address=ip_address,
-            api_token=token_obj,
-            carga_number=sanitized_carga,
-            request_status="timeout",
-            processing_time_ms=int((time.time() - start_time) * 1000),
-        )
-        return JsonResponse(
-            {"error": "Timeout na consulta ao sistema interno"}, status=503
+        _log_api_request(
+            "timeout", ip_address, sanitized_carga, start_ns, api_token=token_obj
         )
+        _cache_carga_error(sanitized_carga, 503, _ERR_TIMEOUT)
+        return HttpResponse(_ERR_TIMEOUT, status=503, content_type="application/json")
 
     except requests.exceptions.ConnectionError:
         logger.error(f"API: Erro de conexão - Carga: {sanitized_carga}")
-        ApiRequestLog.objects.create(
-            ip_address=ip_address,
+        _log_api_request(
+            "connection_error",
+            ip_address,
+            sanitized_carga,
+            start_ns,
             api_token=token_obj,
-            carga_number=sanitized_carga,
-            request_status="connection_error",
-            processing_time_ms=int((time.time() - start_time) * 1000),
         )
-        return JsonResponse(
-            {"error": "Erro de conexão com sistema interno"}, status=503
+        _cache_carga_error(sanitized_carga, 503, _ERR_CONNECTION)
+        return HttpResponse(
+            _ERR_CONNECTION, status=503, content_type="application/json"
         )
 
     except Exception as e:
         logger.error(f"API: Erro inesperado - Carga: {sanitized_carga} - Erro: {e}")
-        ApiRequestLog.objects.create(
-            ip_address=ip_address,
-            api_token=token_obj,
-            carga_number=sanitized_carga,
-            request_status="system_error",
-            processing_time_ms=int((time.time() - start_time) * 1000),
+        _log_api_request(
+            "system_error", ip_address, sanitized_carga, start_ns, api_token=token_obj
         )
-        return JsonResponse({"error": "Erro interno do sistema"}, status=500)
+        # Inclui o HTTPError de quando todas as URLs responderam com erro
+        if isinstance(e, requests.exceptions.RequestException):
+            _cache_carga_error(sanitized_carga, 500, _ERR_INTERNAL)
+        return HttpResponse(_ERR_INTERNAL, status=500, content_type="application/json")